@@ -1,19 +1,93 @@
+import re
 import time
 import difflib
+import functools
+from itertools import islice
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import discord
 from discord.ext import commands
 import asyncio
-from services.music_queue import QueueManager, QueueItem, Track
+from services.music_queue import QueueManager, QueueItem, Track, track_from_info
 from services.youtube_v2 import YouTubeService
 from utils.query_sanitizer import sanitize_play_query
-from utils.ytdl_source_v2 import YTDLSource, auto_reconnect
+from utils.ytdl_source_v2 import YTDLSource
+from utils.voice_reconnect import auto_reconnect
 from utils.music_recommender import MusicRecommender
-from config.settings import CHUNK_SIZE, LASTFM_API_KEY, LASTFM_API_SECRET, LASTFM_USERNAME, LASTFM_PASSWORD
+from utils.metadata_cache import MetadataCache, TTLCache, extract_video_id, metadata_key
+from config.settings import (
+    CHUNK_SIZE, MAX_WORKERS, PLAYLIST_BATCH_SIZE,
+    LASTFM_API_KEY, LASTFM_API_SECRET, LASTFM_USERNAME, LASTFM_PASSWORD,
+    META_CACHE_PATH, META_CACHE_SIZE, META_CACHE_TTL, PROGRESS_EDIT_INTERVAL, PLAYER_WORKERS,
+    SIMILAR_CACHE_SIZE, SIMILAR_CACHE_TTL, SEARCH_RESULTS_CACHE_SIZE, SEARCH_RESULTS_TTL,
+    QUEUE_DISPLAY_LIMIT
+)
 import logging
 
+try:
+    from rapidfuzz import process as fuzz_process, fuzz
+except ImportError:  # rapidfuzz is optional; fall back to difflib
+    fuzz_process = None
+
 logger = logging.getLogger('music_bot')
 
+# Matches playlist URLs (e.g. /playlist?list=... or watch?v=...&list=...) but not
+# song names that merely contain the word "playlist"
+PLAYLIST_PATTERN = re.compile(r'(?:/playlist\?|[?&]list=)')
+# Matches a search result number given to !play / !playnow
+SEARCH_SELECTION_PATTERN = re.compile(r'\d+')
+
+# Error replies with no per-error content; discord.py serializes embeds per send,
+# so one instance can be shared
+PERMISSION_ERROR_EMBED = discord.Embed(
+    title="Permission Error",
+    description="You don't have the required permissions to use this command.",
+    color=discord.Color.red()
+)
+UNEXPECTED_ERROR_EMBED = discord.Embed(
+    title="An Error Occurred",
+    description="An unexpected error occurred. The bot administrator has been notified.",
+    color=discord.Color.red()
+)
+
+
+@functools.lru_cache(maxsize=512)
+def suggest_commands(attempted_command: str, available_commands: tuple[str, ...]) -> tuple[str, ...]:
+    """Return up to three command names close to a mistyped one, memoized per typo."""
+    # Most typos are truncations or extra characters, which plain string checks catch
+    # without running fuzzy matching over every command
+    prefix_hits = [name for name in available_commands if name.startswith(attempted_command)]
+    if not prefix_hits:
+        prefix_hits = [name for name in available_commands if attempted_command.startswith(name)]
+    if prefix_hits:
+        return tuple(prefix_hits[:3])
+
+    if fuzz_process:
+        matches = fuzz_process.extract(
+            attempted_command,
+            available_commands,
+            scorer=fuzz.ratio,
+            limit=3,
+            score_cutoff=60
+        )
+        return tuple(name for name, score, _ in matches)
+
+    return tuple(difflib.get_close_matches(
+        attempted_command,
+        available_commands,
+        n=3,  # Number of suggestions
+        cutoff=0.6  # Similarity threshold (0-1)
+    ))
+
+
+def chunked(iterable, n: int):
+    """Yield successive lists of up to n items from an iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, n)):
+        yield chunk
+
+
 class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -26,31 +100,119 @@ class Music(commands.Cog):
             username=LASTFM_USERNAME,
             password_hash=LASTFM_PASSWORD
         )
-        self.search_results = {}
-        self._lock = asyncio.Lock()  # Add lock for thread safety
-        self._playback_locks = {}  # Dict to store per-guild playback locks
+        self._meta_cache = MetadataCache(
+            max_size=META_CACHE_SIZE,
+            ttl=META_CACHE_TTL,
+            db_path=META_CACHE_PATH
+        )
+        self._similar_cache = TTLCache(max_size=SIMILAR_CACHE_SIZE, ttl=SIMILAR_CACHE_TTL)
+        # Player creation gets its own threads so playlist extraction cannot starve it
+        self._player_executor = ThreadPoolExecutor(
+            max_workers=PLAYER_WORKERS,
+            thread_name_prefix='ytdl_player'
+        )
+        self._help_embed = self._build_help_embed()
+        self.search_results = TTLCache(max_size=SEARCH_RESULTS_CACHE_SIZE, ttl=SEARCH_RESULTS_TTL)
+        self._queue_locks = defaultdict(asyncio.Lock)  # Dict to store per-guild queue locks
+        self._playback_locks = defaultdict(asyncio.Lock)  # Dict to store per-guild playback locks
         self._current_players = {}  # Dict to store currently playing sources
         self._cleanup_events = {}
+        self._prefetch_tasks = {}  # Dict to store per-guild (track, task) prefetches in flight
+        self._playlist_extractions = {}  # Dict to store per-guild playlist extraction tasks in flight
+        self._last_voice_channels = {}  # Dict to store the last voice channel joined per guild
+        self._reconnecting: set[int] = set()  # Guilds whose voice connection is being re-established
+        self._background_tasks = set()  # Strong references to fire-and-forget tasks
+        self._available_commands: tuple[str, ...] = ()  # Sorted command names for suggestions
+        self._command_set: frozenset[str] = frozenset()  # Command names and aliases
+        self._available_commands_count = 0
 
     def _get_playback_lock(self, guild_id: int) -> asyncio.Lock:
         """Get or create a playback lock for a specific guild."""
-        if guild_id not in self._playback_locks:
-            self._playback_locks[guild_id] = asyncio.Lock()
         return self._playback_locks[guild_id]
     
+    def _get_queue_lock(self, guild_id: int) -> asyncio.Lock:
+        """Get or create the lock guarding a specific guild's queue."""
+        return self._queue_locks[guild_id]
+
+    async def _reconnect(self, guild_id: int, voice_client, channel) -> bool:
+        """Re-establish a guild's voice connection without its state being evicted."""
+        # Reconnecting may disconnect the old client first; on_voice_state_update
+        # must not take that for the bot leaving voice
+        self._reconnecting.add(guild_id)
+        try:
+            return await auto_reconnect(voice_client, channel)
+        finally:
+            self._reconnecting.discard(guild_id)
+
+    def _get_available_commands(self) -> tuple[str, ...]:
+        """Get the sorted names of all registered commands, rebuilt only when commands change."""
+        # cog_load runs before the cog's commands are registered, so build lazily
+        command_count = len(self.bot.all_commands)
+        if command_count != self._available_commands_count:
+            self._available_commands = tuple(sorted(cmd.name for cmd in self.bot.commands))
+            # all_commands maps every name and alias to its command
+            self._command_set = frozenset(self.bot.all_commands)
+            self._available_commands_count = command_count
+        return self._available_commands
+
+    async def _cached_extract(self, url: str, semaphore: asyncio.Semaphore) -> Optional[dict]:
+        """Extract video info, serving repeat lookups from the metadata cache."""
+        video_id = extract_video_id(url)
+        if video_id:
+            cached = await self._meta_cache.get(video_id)
+            if cached:
+                return dict(cached)
+
+        info = await self.youtube_service.extract_video_info(url, semaphore)
+        if info and video_id:
+            self._meta_cache.set(video_id, info)
+        return info
+
+    async def _cached_process_url(self, query: str) -> Optional[dict]:
+        """Process a URL or search query, serving repeat lookups from the metadata cache."""
+        key = metadata_key(query)
+        if key:
+            cached = await self._meta_cache.get(key)
+            if cached:
+                return dict(cached)
+
+        info = await self.youtube_service.process_url(query)
+        if info:
+            if key:
+                self._meta_cache.set(key, info)
+            # Let a later play of the resolved URL hit the cache as well
+            video_id = extract_video_id(info.get('url') or '')
+            if video_id and video_id != key:
+                self._meta_cache.set(video_id, info)
+        return info
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine as a background task, keeping a reference until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _bounded_process(self, semaphore: asyncio.Semaphore, query: str) -> Optional[dict]:
+        """Process a URL or search query while holding a slot of the given semaphore."""
+        async with semaphore:
+            return await self._cached_process_url(query)
+
     def schedule_callback(self, coro):
-        """Schedule a coroutine to run in the bot's event loop."""
-        asyncio.run_coroutine_threadsafe(coro, self.bot.loop)
+        """Schedule a coroutine to run in the bot's event loop from any thread."""
+        self.bot.loop.call_soon_threadsafe(self._spawn, coro)
 
     async def ensure_voice_client(self, ctx):
         """Ensure voice client is properly connected."""
         if not ctx.voice_client or not ctx.voice_client.is_connected():
             if ctx.author.voice:
-                await ctx.author.voice.channel.connect()
+                channel = ctx.author.voice.channel
+                await channel.connect()
+                self._last_voice_channels[ctx.guild.id] = channel
             else:
                 raise ValueError("Not connected to a voice channel")
 
-    async def create_player(self, ctx, track) -> Optional[discord.PCMVolumeTransformer]:
+    async def create_player(self, ctx, track) -> Optional[YTDLSource]:
         """Create a player in a thread-safe manner."""
         guild_id = ctx.guild.id
         playback_lock = self._get_playback_lock(guild_id)
@@ -58,51 +220,111 @@ class Music(commands.Cog):
         async with playback_lock:
             try:
                 # Clean up existing player if any
-                if guild_id in self._current_players:
+                old_player = self._current_players.get(guild_id)
+                if old_player:
                     try:
-                        self._current_players[guild_id].cleanup()
+                        old_player.cleanup()
                     except Exception as e:
-                        logger.error(f"Error cleaning up old player: {e}")
+                        logger.error("Error cleaning up old player: %s", e)
 
                 # Create new player
-                logger.info(f"Creating new player for track: {track.title}")
-                player = await YTDLSource.from_track(track, loop=self.bot.loop)
+                logger.info("Creating new player for track: %s", track.title)
+                player = await YTDLSource.from_track(
+                    track, loop=self.bot.loop, executor=self._player_executor,
+                    session=self.bot.http_session
+                )
                 self._current_players[guild_id] = player
                 return player
 
             except Exception as e:
-                logger.error(f"Error creating player: {e}")
-                if guild_id in self._current_players:
-                    del self._current_players[guild_id]
+                logger.error("Error creating player: %s", e)
+                self._current_players.pop(guild_id, None)
                 return None
 
     async def cleanup_player(self, guild_id: int):
         """Clean up player resources."""
         playback_lock = self._get_playback_lock(guild_id)
         async with playback_lock:
-            if guild_id in self._current_players:
+            player = self._current_players.pop(guild_id, None)
+            if player:
                 try:
-                    self._current_players[guild_id].cleanup()
+                    player.cleanup()
                 except Exception as e:
-                    logger.error(f"Error during player cleanup: {e}")
-                finally:
-                    del self._current_players[guild_id]
+                    logger.error("Error during player cleanup: %s", e)
+
+    def _schedule_prefetch(self, guild_id: int):
+        """Resolve the upcoming track's audio stream while the current one plays."""
+        queue = self.queue_manager.get_queue(guild_id)
+        if not queue.queue:
+            return
+
+        track = queue.queue[0].track
+        task = asyncio.create_task(self._prefetch_next(track))
+        self._prefetch_tasks[guild_id] = (track, task)
+
+    async def _prefetch_next(self, track):
+        """
+        Resolve a queued track's stream URL so play_next only has to start FFmpeg.
+
+        Only the stream info is fetched ahead: an FFmpeg process opened now would
+        sit idle on the connection for the whole current track.
+        """
+        try:
+            await YTDLSource.prefetch(track.url, loop=self.bot.loop, executor=self._player_executor)
+            logger.info("Prefetched stream for track: %s", track.title)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Could not prefetch track %s: %s", track.title, e)
+
+    async def _await_prefetch(self, guild_id: int, track):
+        """Wait for an in-flight prefetch of this track, cancelling a stale one."""
+        pending = self._prefetch_tasks.pop(guild_id, None)
+        if pending:
+            pending_track, task = pending
+            if not task.done():
+                if pending_track is track:
+                    await task
+                else:
+                    task.cancel()
+
+    def _cancel_playlist_extraction(self, guild_id: int):
+        """Cancel playlist entry extractions still running for a guild."""
+        for task in self._playlist_extractions.pop(guild_id, ()):
+            task.cancel()
+
+    def _evict_guild_state(self, guild_id: int):
+        """Drop per-guild bookkeeping after the bot leaves the guild's voice channel."""
+        # A held lock still guards a running critical section, so keep it
+        for locks in (self._queue_locks, self._playback_locks):
+            lock = locks.get(guild_id)
+            if lock and not lock.locked():
+                del locks[guild_id]
+        self._cleanup_events.pop(guild_id, None)
+        self._last_voice_channels.pop(guild_id, None)
+        self.search_results.delete(guild_id)
+        self.queue_manager.remove_queue(guild_id)
+
+    def _discard_prefetched(self, guild_id: int):
+        """Cancel any in-flight prefetch."""
+        pending = self._prefetch_tasks.pop(guild_id, None)
+        if pending and not pending[1].done():
+            pending[1].cancel()
 
     async def _handle_playback_complete(self, ctx, error):
         """Handle completion of track playback."""
         logger.info("Playback complete handler triggered")
         should_play_next = False
+        queue = self.queue_manager.get_queue(ctx.guild.id)
 
-        async with self._lock:
+        async with self._get_queue_lock(ctx.guild.id):
             try:
                 if error:
-                    logger.error(f"Playback completed with error: {str(error)}")
+                    logger.error("Playback completed with error: %s", error)
                     await ctx.send(f"❌ An error occurred while playing: {str(error)}")
                 else:
                     logger.info("Playback completed successfully")
 
-                queue = self.queue_manager.get_queue(ctx.guild.id)
-                
                 if queue.queue:
                     logger.info("More tracks in queue")
                     should_play_next = True
@@ -112,61 +334,70 @@ class Music(commands.Cog):
                     queue.current_track = None
 
             except Exception as e:
-                logger.error(f"Error in playback complete handler: {str(e)}")
+                logger.error("Error in playback complete handler: %s", e)
                 should_play_next = False
 
         if should_play_next:
-            await self.play_next(ctx)
+            await self.play_next(ctx, queue=queue)
                 
-    async def play_next(self, ctx):
-        """Play the next track in queue."""
-        logger.info("Entering play_next method")
-        next_track = None
+    async def _pop_next_track(self, ctx, queue) -> Optional[Track]:
+        """Take the next track off the queue, or return None if playback should stop."""
         guild_id = ctx.guild.id
-        
-        async with self._lock:
+
+        async with self._get_queue_lock(guild_id):
             try:
-                queue = self.queue_manager.get_queue(guild_id)
-                
                 # Check voice client
                 if not ctx.voice_client or not ctx.voice_client.is_connected():
                     logger.error("Voice client is not properly connected")
-                    # Try to reconnect
-                    if not await auto_reconnect(ctx.voice_client, ctx.author.voice.channel):
+                    # Try to reconnect to the channel we last joined in this guild
+                    channel = self._last_voice_channels.get(guild_id)
+                    if not channel or not await self._reconnect(guild_id, ctx.voice_client, channel):
                         await self.leave(ctx)
                         # queue.is_playing = False
-                        return
+                        return None
 
                 if not queue.queue:
                     logger.info("Queue is empty")
                     queue.is_playing = False
                     queue.current_track = None
-                    return
+                    return None
 
                 next_track = queue.get_next_track()
                 queue.current_track = next_track
-                logger.info(f"Preparing to play: {next_track.title}")
+                logger.info("Preparing to play: %s", next_track.title)
+                return next_track
 
             except Exception as e:
-                logger.error(f'Error preparing playback: {str(e)}')
+                logger.error('Error preparing playback: %s', e)
+                return None
+
+    async def play_next(self, ctx, queue=None):
+        """Play the next track in queue, moving past tracks that fail to start."""
+        logger.info("Entering play_next method")
+        guild_id = ctx.guild.id
+        if queue is None:
+            queue = self.queue_manager.get_queue(guild_id)
+        retry_delay = 1
+
+        while True:
+            next_track = await self._pop_next_track(ctx, queue)
+            if not next_track:
                 return
 
-        # Create player and start playback outside the lock
-        if next_track:
+            # Create player and start playback outside the lock
             try:
-                # Create player
-                player = await YTDLSource.from_track(next_track, loop=self.bot.loop)
+                # The stream was usually resolved during the previous track; only FFmpeg
+                # starts here. The player is tracked in _current_players for cleanup_player
+                await self._await_prefetch(guild_id, next_track)
+                player = await self.create_player(ctx, next_track)
                 if not player:
                     raise Exception("Failed to create player")
 
                 def after_playing(error):
                     if error:
-                        logger.error(f"Playback error: {str(error)}")
-                    # Schedule cleanup and next track
-                    asyncio.run_coroutine_threadsafe(
-                        self._handle_playback_complete(ctx, error),
-                        self.bot.loop
-                    )
+                        logger.error("Playback error: %s", error)
+                    # Schedule cleanup and next track as a task on the bot's loop
+                    self.schedule_callback(self._handle_playback_complete(ctx, error))
 
                 # Set appropriate volume
                 player.volume = 1.0  # Ensure volume is at max
@@ -174,20 +405,59 @@ class Music(commands.Cog):
                 # Start playback
                 ctx.voice_client.play(player, after=after_playing)
                 await ctx.send(f'🎵 Now playing: {player.title}')
-                logger.info(f"Successfully started playing: {player.title}")
+                logger.info("Successfully started playing: %s", player.title)
+
+                self._schedule_prefetch(guild_id)
+                return
                 
             except Exception as e:
-                logger.error(f'Error during playback: {str(e)}')
+                logger.error('Error during playback: %s', e)
                 await ctx.send(f'❌ Error playing track: {str(e)}')
-                await asyncio.sleep(1)
-                await self.play_next(ctx)
+                # Back off between consecutive failures, then move on to the next track
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 8)
 
     async def _handle_playback_error(self, ctx, guild_id: int):
         """Handle playback error with proper cleanup."""
         await self.cleanup_player(guild_id)
-        await asyncio.sleep(1)
+        # play_next loops over failing tracks with its own backoff, so no retry here
         await self.play_next(ctx)
 
+    @staticmethod
+    def _entry_track(entry: dict) -> Optional[Track]:
+        """Build a Track straight from a playlist entry, or None if the entry lacks metadata."""
+        title = entry.get('title')
+        url = entry.get('webpage_url') or entry.get('url')
+        if not title or not url:
+            return None
+        return Track(
+            title=title,
+            url=url,
+            duration=entry.get('duration') or 0,
+            thumbnail=entry.get('thumbnail'),
+            stream_url=entry.get('stream_url')
+        )
+
+    async def _update_playlist_progress(self, ctx, queue, content: str, force: bool = False):
+        """Edit the playlist progress message, throttled to PROGRESS_EDIT_INTERVAL."""
+        loader = queue.playlist_loader
+        if not loader:
+            return
+
+        now = time.monotonic()
+        if not force and now - loader.last_progress_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        loader.last_progress_edit = now
+
+        if loader.progress_message:
+            try:
+                await loader.progress_message.edit(content=content)
+                return
+            except discord.HTTPException as e:
+                logger.warning("Could not edit playlist progress message: %s", e)
+
+        loader.progress_message = await ctx.send(content)
+
     async def process_playlist(self, ctx, playlist_url: str):
         try:
             queue = self.queue_manager.get_queue(ctx.guild.id)
@@ -195,29 +465,37 @@ class Music(commands.Cog):
             
             # Initialize playlist loading if this is the first batch
             if not queue.playlist_loader:
-                await ctx.send("🎵 Extracting playlist information...")
+                # This message is edited in place with progress for the rest of the playlist
+                progress_message = await ctx.send("🎵 Extracting playlist information...")
                 try:
                     video_entries, total_tracks = await self.youtube_service.get_playlist_info(playlist_url)
                     if not video_entries:
-                        await ctx.send("❌ Could not find playlist entries. Make sure the playlist is public.")
+                        await progress_message.edit(
+                            content="❌ Could not find playlist entries. Make sure the playlist is public."
+                        )
                         return
                     
                     queue.start_playlist_loading(playlist_url)
+                    queue.playlist_loader.progress_message = progress_message
                     queue.playlist_loader.video_entries = video_entries
                     queue.playlist_loader.total_tracks = total_tracks
-                    await ctx.send(f"Found {total_tracks} tracks in playlist. Starting processing...")
+                    await self._update_playlist_progress(
+                        ctx, queue,
+                        f"Found {total_tracks} tracks in playlist. Starting processing...",
+                        force=True
+                    )
                     
                 except Exception as e:
-                    await ctx.send(f"❌ Error getting playlist info: {str(e)}")
-                    logger.error(f"Error getting playlist info: {str(e)}")
+                    await progress_message.edit(content=f"❌ Error getting playlist info: {str(e)}")
+                    logger.error("Error getting playlist info: %s", e)
                     return
             
             # Create a semaphore to limit concurrent downloads
-            semaphore = asyncio.Semaphore(3)
+            semaphore = asyncio.Semaphore(MAX_WORKERS)
             
             # Calculate the batch range
             start_idx = queue.playlist_loader.current_index
-            end_idx = min(start_idx + 10, len(queue.playlist_loader.video_entries))
+            end_idx = min(start_idx + PLAYLIST_BATCH_SIZE, len(queue.playlist_loader.video_entries))
             current_batch = queue.playlist_loader.video_entries[start_idx:end_idx]
             
             # Skip if we've reached the end of the playlist
@@ -228,45 +506,88 @@ class Music(commands.Cog):
             added_tracks = 0
             skipped_tracks = 0
             
-            # Process the batch
-            tasks = [
-                self.youtube_service.extract_video_info(entry['url'], semaphore)
-                for entry in current_batch
-            ]
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Process each result in the batch
-            for i, result in enumerate(batch_results):
-                if isinstance(result, Exception):
-                    skipped_tracks += 1
-                    logger.error(f"Error processing track: {str(result)}")
-                    continue
-                    
-                if result:
-                    track = Track(**result)
-                    
-                    # Add callback to the 9th track (if not the last batch)
-                    if (added_tracks == 8 and 
-                        not queue.is_playlist_complete()):
-                        queue.add_track(
-                            track,
-                            on_start=lambda: asyncio.create_task(
-                                self.load_next_batch(ctx, playlist_url)
-                            )
+            async def extract_entry(index, entry):
+                # Playlist listings already carry title/duration, and the stream URL is
+                # resolved just in time by YTDLSource.from_track, so skip re-extraction
+                track = self._entry_track(entry)
+                if track:
+                    return index, track
+                try:
+                    info = await self._cached_extract(entry['url'], semaphore)
+                    return index, track_from_info(info) if info else None
+                except Exception as e:
+                    return index, e
+
+            # Queue tracks as soon as they resolve, releasing them in playlist order
+            pending_results = {}
+            next_index = 0
+            async with asyncio.TaskGroup() as task_group:
+                tasks = [
+                    task_group.create_task(extract_entry(i, entry))
+                    for i, entry in enumerate(current_batch)
+                ]
+                # Let stop/leave cancel the extractions still in flight
+                self._playlist_extractions[ctx.guild.id] = tasks
+                try:
+                    for future in asyncio.as_completed(tasks):
+                        try:
+                            index, result = await future
+                        except asyncio.CancelledError:
+                            if asyncio.current_task().cancelling():
+                                raise
+                            logger.info("Playlist loading cancelled")
+                            return
+                        pending_results[index] = result
+
+                        ready_tracks = []
+                        while next_index in pending_results:
+                            result = pending_results.pop(next_index)
+                            next_index += 1
+
+                            if isinstance(result, Exception):
+                                skipped_tracks += 1
+                                logger.error("Error processing track: %s", result)
+                                continue
+
+                            if not result:
+                                skipped_tracks += 1
+                                continue
+
+                            track = result
+
+                            # Add callback to the second-to-last track (if not the last batch)
+                            if (added_tracks == PLAYLIST_BATCH_SIZE - 2 and
+                                not queue.is_playlist_complete()):
+                                queue.add_tracks(ready_tracks)
+                                ready_tracks = []
+                                queue.add_track(
+                                    track,
+                                    on_start=functools.partial(
+                                        self.load_next_batch, ctx, playlist_url
+                                    )
+                                )
+                            else:
+                                ready_tracks.append(track)
+
+                            added_tracks += 1
+
+                        queue.add_tracks(ready_tracks)
+                        await self._update_playlist_progress(
+                            ctx, queue,
+                            f"🎵 Loading playlist... Progress: {start_idx + next_index}/"
+                            f"{queue.playlist_loader.total_tracks} tracks"
                         )
-                    else:
-                        queue.add_track(track)
-                    
-                    # Start playback if this is the first track overall
-                    if (start_idx == 0 and i == 0 and not queue.is_playing):
-                        queue.is_playing = True
-                        await self.play_next(ctx)
-                        await ctx.send(f"🎵 Starting playback: {result['title']}")
-                    
-                    added_tracks += 1
-                else:
-                    skipped_tracks += 1
-            
+
+                        # Start playback with the first resolved track of the playlist
+                        # while the rest of the batch keeps resolving
+                        if start_idx == 0 and added_tracks and not queue.is_playing:
+                            queue.is_playing = True
+                            self._spawn(self.play_next(ctx))
+                            await ctx.send(f"🎵 Starting playback: {queue.queue[0].track.title}")
+                finally:
+                    if self._playlist_extractions.get(ctx.guild.id) is tasks:
+                        del self._playlist_extractions[ctx.guild.id]
+
             # Update the current index
             queue.playlist_loader.current_index = end_idx
             
@@ -276,26 +597,30 @@ class Music(commands.Cog):
             
             # If this is the last batch, send final summary
             if queue.is_playlist_complete():
-                await ctx.send(
+                await self._update_playlist_progress(
+                    ctx, queue,
                     f"✅ Finished processing playlist!\n"
                     f"Progress: {current}/{total} tracks\n"
                     f"Added in this batch: {added_tracks}\n"
                     f"Skipped in this batch: {skipped_tracks}\n"
-                    f"Time taken: {processing_time:.2f} seconds"
+                    f"Time taken: {processing_time:.2f} seconds",
+                    force=True
                 )
                 queue.finish_playlist_loading()
             else:
-                await ctx.send(
+                await self._update_playlist_progress(
+                    ctx, queue,
                     f"✅ Loaded batch of tracks ({start_idx + 1} to {end_idx})\n"
                     f"Progress: {current}/{total} tracks\n"
                     f"Added: {added_tracks} tracks\n"
                     f"Skipped: {skipped_tracks} tracks\n"
-                    f"Time taken: {processing_time:.2f} seconds"
+                    f"Time taken: {processing_time:.2f} seconds",
+                    force=True
                 )
                 
         except Exception as e:
             await ctx.send(f"❌ Error processing playlist: {str(e)}")
-            logger.error(f"Error processing playlist: {str(e)}")
+            logger.error("Error processing playlist: %s", e)
             queue.finish_playlist_loading()
 
     async def load_next_batch(self, ctx, playlist_url: str):
@@ -318,13 +643,19 @@ class Music(commands.Cog):
             await ctx.send("❌ You must be in a voice channel to play music!")
             return False
 
+        channel = ctx.message.author.voice.channel
         try:
             if ctx.voice_client is None:
-                await ctx.message.author.voice.channel.connect()
+                await channel.connect()
                 logger.info("Connected to voice channel")
-            elif ctx.voice_client.channel != ctx.message.author.voice.channel:
-                await ctx.voice_client.move_to(ctx.message.author.voice.channel)
+            elif not ctx.voice_client.is_connected():
+                # Resume the dropped connection instead of waiting for a full reconnect
+                if not await self._reconnect(ctx.guild.id, ctx.voice_client, channel):
+                    raise ConnectionError("Could not reconnect to voice channel")
+            elif ctx.voice_client.channel != channel:
+                await ctx.voice_client.move_to(channel)
                 logger.info("Moved to voice channel")
+            self._last_voice_channels[ctx.guild.id] = channel
             return True
         except Exception as e:
             logger.error(f"Voice connection error: {str(e)}")
@@ -333,12 +664,13 @@ class Music(commands.Cog):
 
     async def _handle_search_selection(self, ctx, query):
         """Handle selection from search results"""
-        if not query.isdigit():
+        if not SEARCH_SELECTION_PATTERN.fullmatch(query):
             return query
             
         index = int(query) - 1
-        if ctx.guild.id in self.search_results and 0 <= index < len(self.search_results[ctx.guild.id]):
-            selected_video = self.search_results[ctx.guild.id][index]
+        results = self.search_results.get(ctx.guild.id)
+        if results and 0 <= index < len(results):
+            selected_video = results[index]
             return selected_video['url']
         
         await ctx.send("❌ Invalid search result number or no recent search results!")
@@ -355,14 +687,16 @@ class Music(commands.Cog):
         Returns:
             tuple: (track_info, should_start_playing)
         """
-        async with self._lock:
-            try:
+        try:
+            # Resolve the track before taking the lock so other queue
+            # operations in this guild are not held up by the lookup
+            track_info = await self._cached_process_url(query)
+            track = track_from_info(track_info)
+
+            async with self._get_queue_lock(ctx.guild.id):
                 queue = self.queue_manager.get_queue(ctx.guild.id)
                 logger.info(f"Current queue length: {len(queue.queue)}")
 
-                track_info = await self.youtube_service.process_url(query)
-                track = Track(**track_info)
-
                 if position is not None:
                     queue.queue.insert(position, QueueItem(track))
                 else:
@@ -374,12 +708,12 @@ class Music(commands.Cog):
                     queue.is_playing = True
                     logger.info("Will start playback")
 
-                return track_info, should_start_playing
+            return track_info, should_start_playing
 
-            except Exception as e:
-                logger.error(f"Error processing track: {str(e)}")
-                await ctx.send(f"❌ Error: {str(e)}")
-                return None, False
+        except Exception as e:
+            logger.error(f"Error processing track: {str(e)}")
+            await ctx.send(f"❌ Error: {str(e)}")
+            return None, False
 
     @commands.command(name='play', aliases=['p'])
     async def play(self, ctx, *, query: str):
@@ -403,9 +737,10 @@ class Music(commands.Cog):
                 return
 
             # Handle playlist
-            if "playlist" in query or "list=" in query:
+            if PLAYLIST_PATTERN.search(query):
                 logger.info("Playlist URL detected, processing playlist...")
-                await self.process_playlist(ctx, query)
+                # Load the playlist in the background so the command returns right away
+                self._spawn(self.process_playlist(ctx, query))
                 return
 
             # Process single track
@@ -445,7 +780,7 @@ class Music(commands.Cog):
                 return
 
             # Don't allow playlists
-            if "playlist" in query or "list=" in query:
+            if PLAYLIST_PATTERN.search(query):
                 await ctx.send("❌ Play Now command doesn't support playlists. Use regular play command instead!")
                 return
 
@@ -465,39 +800,64 @@ class Music(commands.Cog):
             logger.error(f"Error in playnow command: {str(e)}")
             await ctx.send(f'❌ Error: {str(e)}')
 
+    async def _get_similar_tracks(self, title: str, limit) -> list:
+        """Get Last.fm recommendations for a title, cached per (title, limit)."""
+        cache_key = (title.lower(), limit)
+        similar_tracks = self._similar_cache.get(cache_key)
+        if similar_tracks is not None:
+            return similar_tracks
+
+        # Last.fm lookups are blocking network calls, keep them off the event loop
+        similar_tracks = await self.bot.loop.run_in_executor(
+            None,
+            lambda: self.recommender.get_similar_tracks(title, limit=limit)
+        )
+        # An empty list may come from a transient API error, so only cache hits
+        if similar_tracks:
+            self._similar_cache.set(cache_key, similar_tracks)
+        return similar_tracks
+
     @commands.command(name='radio', aliases=['r'])
-    async def find_similar(self, ctx, *, limit=5):
+    async def find_similar(self, ctx, limit: int = 5):
         # Get the currently playing track
         queue = self.queue_manager.get_queue(ctx.guild.id)
         current_track = queue.current_track.title
         logger.info(f"Find similar track to {current_track}")
-        try:
-            limit = int(limit)
-        except:
-            pass
-        
-        similar_tracks = self.recommender.get_similar_tracks(current_track, limit=limit)        
+
+        similar_tracks = await self._get_similar_tracks(current_track, limit)
+        await ctx.send(f"Start adding {len(similar_tracks)} similar tracks")
+
+        # Resolve all recommendations concurrently, outside the queue lock
+        semaphore = asyncio.Semaphore(3)
+        results = await asyncio.gather(
+            *(self._bounded_process(semaphore, track['search_query']) for track in similar_tracks),
+            return_exceptions=True
+        )
+
         # Create an embed with recommendations
-        embed = discord.Embed(title="Similar Tracks")
+        failed_tracks = 0
+        new_tracks = []
+        lines = []
+        for track, track_info in zip(similar_tracks, results):
+            if isinstance(track_info, Exception) or not track_info:
+                failed_tracks += 1
+                logger.error("Error processing track: %s", track_info)
+                continue
+
+            lines.append(
+                f"**{track['artist']} - {track['title']}** — "
+                f"Similarity: {track['similarity_score']:.2f}"
+            )
+            new_tracks.append(track_from_info(track_info))
+            logger.info("Added track to queue: %s", track_info['title'])
+
         # Handle queue operations with lock
-        async with self._lock:
-            await ctx.send(f"Start adding {len(similar_tracks)} similar tracks")
-            for track in similar_tracks:
-                try:
-                    embed.add_field(
-                        name=f"{track['artist']} - {track['title']}", 
-                        value=f"Similarity: {track['similarity_score']:.2f}", 
-                        inline=False
-                    )
-                    track_info = await self.youtube_service.process_url(f"{track['artist']} - {track['title']}")
-                    queue.add_track(Track(**track_info))
-                    logger.info(f"Added track to queue: {track_info['title']}")
-                except Exception as e:
-                    logger.error(f"Error processing track: {str(e)}")
-                    await ctx.send(f"❌ Error: {str(e)}")
-                    return
-                    
-        await ctx.send(embed=embed)
+        async with self._get_queue_lock(ctx.guild.id):
+            queue.add_tracks(new_tracks)
+
+        # Send the failure notice along with the embed in a single message
+        content = f"❌ Could not add {failed_tracks} of the similar tracks" if failed_tracks else None
+        await ctx.send(content, embed=discord.Embed(title="Similar Tracks", description="\n".join(lines)))
 
     @commands.command(name='search', aliases=['s'])
     async def search(self, ctx, *, query: str):
@@ -516,20 +876,19 @@ class Music(commands.Cog):
 
             # Store search results for this server
             server_id = ctx.guild.id
-            self.search_results[server_id] = results
+            self.search_results.set(server_id, results)
 
-            embed = discord.Embed(title="🔎 Search Results", color=discord.Color.blue())
-            
+            lines = []
             for i, entry in enumerate(results, 1):
-                duration = entry.get('duration', 0)
-                embed.add_field(
-                    name=f"{i}. {entry['title']}",
-                    value=f"Duration: {int(duration // 60)}:{int(duration % 60):02d}",
-                    inline=False
-                )
+                duration_min, duration_sec = divmod(int(entry.get('duration', 0)), 60)
+                lines.append(f"**{i}.** {entry['title']} ({duration_min}:{duration_sec:02d})")
 
-            await ctx.send(embed=embed)
-            await ctx.send("Use !play <number> to play a song from the search results")
+            embed = discord.Embed(
+                title="🔎 Search Results",
+                description="\n".join(lines),
+                color=discord.Color.blue()
+            )
+            await ctx.send("Use !play <number> to play a song from the search results", embed=embed)
 
         except Exception as e:
             await ctx.send(f'❌ Error: {str(e)}')
@@ -545,74 +904,81 @@ class Music(commands.Cog):
             await ctx.send("📪 The queue is empty!")
             return
 
-        embed = discord.Embed(title="🎵 Music Queue", color=discord.Color.blue())
-        
-        # Add current track
-        if queue.current_track:
-            embed.add_field(
-                name="▶️ Currently Playing:",
-                value=queue.current_track.title,
-                inline=False
-            )
-
-        # Add queued tracks (up to 10)
-        queue_list = list(queue.queue)
-        for i, q_item in enumerate(queue_list[:10], 1):
-            duration_min = int(q_item.track.duration // 60)
-            duration_sec = int(q_item.track.duration % 60)
-            embed.add_field(
-                name=f"{i}. {q_item.track.title}",
-                value=f"Duration: {duration_min}:{duration_sec:02d}",
-                inline=False
-            )
+        lines = []
+
+        # Add queued tracks (up to QUEUE_DISPLAY_LIMIT)
+        for i, (title, duration) in enumerate(queue.preview(QUEUE_DISPLAY_LIMIT), 1):
+            duration_min, duration_sec = divmod(int(duration), 60)
+            lines.append(f"**{i}.** {title} ({duration_min}:{duration_sec:02d})")
+
+        # One embed per 10 tracks, the first one headed by the current track
+        embeds = []
+        for page in chunked(lines, 10) if lines else [[]]:
+            embed = discord.Embed(description="\n".join(page), color=discord.Color.blue())
+            if not embeds:
+                embed.title = "🎵 Music Queue"
+                if queue.current_track:
+                    embed.description = (
+                        f"▶️ **Currently Playing:** {queue.current_track.title}\n\n{embed.description}"
+                    )
+            embeds.append(embed)
 
         # Add total number of tracks in queue
-        total_tracks = len(queue_list)
-        if total_tracks > 10:
-            embed.add_field(
-                name="And more...",
-                value=f"{total_tracks - 10} additional tracks in queue",
-                inline=False
+        total_tracks = len(queue.queue)
+        if total_tracks > QUEUE_DISPLAY_LIMIT:
+            embeds[-1].description += (
+                f"\n\n...and {total_tracks - QUEUE_DISPLAY_LIMIT} additional tracks in queue"
             )
 
         # Add playlist processing status
         if queue.playlist_processing:
-            embed.add_field(
+            embeds[-1].add_field(
                 name="ℹ️ Notice",
                 value="A playlist is currently being processed in the background.",
                 inline=False
             )
 
-        await ctx.send(embed=embed)
+        await self._send_embeds(ctx, embeds)
+
+    @staticmethod
+    async def _send_embeds(ctx, embeds: list[discord.Embed]):
+        """Send embeds packed into as few messages as Discord's per-message limits allow."""
+        batch, batch_size = [], 0
+        for embed in embeds:
+            # At most 10 embeds and 6000 characters across all embeds per message
+            if batch and (len(batch) == 10 or batch_size + len(embed) > 6000):
+                await ctx.send(embeds=batch)
+                batch, batch_size = [], 0
+            batch.append(embed)
+            batch_size += len(embed)
+        if batch:
+            await ctx.send(embeds=batch)
 
     @commands.command(name='stop')
     async def stop(self, ctx):
         """Stop playing and clear the queue."""
         guild_id = ctx.guild.id
         
-        async with self._lock:
+        async with self._get_queue_lock(guild_id):
             queue = self.queue_manager.get_queue(guild_id)
             if queue:
                 queue.clear()
 
         # Clean up player
+        self._cancel_playlist_extraction(guild_id)
+        self._discard_prefetched(guild_id)
         await self.cleanup_player(guild_id)
 
         if ctx.voice_client and ctx.voice_client.is_playing():
             ctx.voice_client.stop()
             await ctx.voice_client.disconnect()
+            self._evict_guild_state(guild_id)
             await ctx.send("⏹️ Playback stopped and queue cleared.")
         else:
             await ctx.send("❌ Nothing is playing!")
 
     @commands.command(name='skip', aliases=['skipkip'])
-    async def next(self, ctx, amount: str = "1"):
-        try:
-            skip_amount = int(amount)
-        except ValueError:
-            await ctx.send("❌ Please provide a valid number!")
-            return
-
+    async def next(self, ctx, skip_amount: int = 1):
         if skip_amount < 1:
             await ctx.send("❌ Please provide a positive number!")
             return
@@ -626,6 +992,9 @@ class Music(commands.Cog):
 
         # Skip tracks and get the result
         tracks_skipped = queue.skip_tracks(skip_amount)
+        if skip_amount > 1:
+            # The prefetched track was skipped over
+            self._discard_prefetched(ctx.guild.id)
         
         # Stop the current audio
         if ctx.voice_client and ctx.voice_client.is_playing():
@@ -650,6 +1019,7 @@ class Music(commands.Cog):
         else:
             await ctx.voice_client.move_to(channel)
             await ctx.send(f'👋 Moved to {channel.name}')
+        self._last_voice_channels[ctx.guild.id] = channel
 
     @commands.command(name='leave')
     async def leave(self, ctx):
@@ -657,16 +1027,37 @@ class Music(commands.Cog):
         queue = self.queue_manager.get_queue(ctx.guild.id)
         if queue:
             queue.clear()
+        self._cancel_playlist_extraction(ctx.guild.id)
+        self._discard_prefetched(ctx.guild.id)
+        await self.cleanup_player(ctx.guild.id)
 
         if ctx.voice_client:
             await ctx.voice_client.disconnect()
+            self._evict_guild_state(ctx.guild.id)
             await ctx.send("👋 Left the voice channel.")
         else:
             await ctx.send("❌ I'm not in a voice channel!")
                  
-    @commands.command(name='helpm')
-    async def helpm(self, ctx):
-        """Display all available music commands and their usage"""
+    @commands.command(name='refreshmeta')
+    async def refreshmeta(self, ctx, url: Optional[str] = None):
+        """Forget cached track information for a URL, or for everything"""
+        if url:
+            key = metadata_key(url)
+            if not key and not PLAYLIST_PATTERN.search(url):
+                await ctx.send("❌ Please provide a YouTube video or playlist URL!")
+                return
+            if key:
+                self._meta_cache.delete(key)
+            self.youtube_service.invalidate(url)
+            await ctx.send("🔄 Cached track information cleared for that URL.")
+        else:
+            self._meta_cache.clear()
+            self.youtube_service.invalidate()
+            await ctx.send("🔄 All cached track information cleared.")
+
+    @staticmethod
+    def _build_help_embed() -> discord.Embed:
+        """Build the static help embed shown by the helpm command."""
         embed = discord.Embed(
             title="🎵 MusicAI Commands",
             description="Here are all available music commands:",
@@ -691,6 +1082,7 @@ class Music(commands.Cog):
             value="""
     `!queue`: Display current queue
     `!radio` (or `!r`) `[number]`: Add radio songs to current track (default: 5)
+    `!refreshmeta` `[URL]`: Forget cached track info (for one video, playlist or all)
     """,
             inline=False
         )
@@ -727,37 +1119,55 @@ class Music(commands.Cog):
         )
 
         embed.set_footer(text="Need more help? Ask a moderator!")
-        
-        await ctx.send(embed=embed)
-        
+        return embed
+
+    @commands.command(name='helpm')
+    async def helpm(self, ctx):
+        """Display all available music commands and their usage"""
+        await ctx.send(embed=self._help_embed)
+
     @commands.Cog.listener('on_voice_state_update')
     async def on_voice_state_update(self, member, before, after):
         """Event handler for voice state updates"""
-        # Ignore bot's own voice state updates
+        # The bot's own voice state only matters when it leaves voice (e.g. kicked
+        # by a moderator or after everyone left): release the guild's state then
         if member == self.bot.user:
+            if before.channel and not after.channel:
+                guild = before.channel.guild
+                guild_id = guild.id
+                # A disconnect made while reconnecting, or one already followed by a new
+                # connection, is not the bot leaving voice
+                if guild_id in self._reconnecting or (
+                    guild.voice_client and guild.voice_client.is_connected()
+                ):
+                    return
+                self._cancel_playlist_extraction(guild_id)
+                self._discard_prefetched(guild_id)
+                await self.cleanup_player(guild_id)
+                self._evict_guild_state(guild_id)
             return
         
-        # Check if the member left a channel
-        if before.channel and not after.channel:
-            # Get the voice channel the bot is in
-            for voice_client in self.bot.voice_clients:
-                # Get current channel members directly from voice_client.channel
-                if voice_client.channel == before.channel:
-                    current_channel = voice_client.channel
-                    # Count remaining members (excluding bots)
-                    remaining_members = len([
-                        m for m in current_channel.members 
-                        if not m.bot
-                    ])
-                    
-                    # If no human members remain, disconnect the bot
-                    if remaining_members == 0:
-                        await voice_client.disconnect()
-                        # Try to find a text channel to send notification
-                        if isinstance(current_channel.guild.system_channel, discord.TextChannel):
-                            await current_channel.guild.system_channel.send(
-                                f"All users left the voice channel. I'm leaving too!"
-                            )
+        # Only leaving a channel can leave the bot alone
+        if not before.channel or after.channel:
+            return
+
+        # Get the voice client of the guild the member left, if it's in that channel
+        voice_client = before.channel.guild.voice_client
+        if not voice_client or voice_client.channel != before.channel:
+            return
+
+        current_channel = voice_client.channel
+        # Count remaining members (excluding bots)
+        remaining_members = sum(1 for m in current_channel.members if not m.bot)
+
+        # If no human members remain, disconnect the bot
+        if remaining_members == 0:
+            await voice_client.disconnect()
+            # Try to find a text channel to send notification
+            if isinstance(current_channel.guild.system_channel, discord.TextChannel):
+                await current_channel.guild.system_channel.send(
+                    f"All users left the voice channel. I'm leaving too!"
+                )
         
     @commands.Cog.listener('on_command_error')
     async def error_handler(self, ctx, error):
@@ -766,15 +1176,14 @@ class Music(commands.Cog):
             attempted_command = ctx.message.content.split()[0][len(ctx.prefix):].lower()
             
             # Get list of all available commands
-            available_commands = [cmd.name for cmd in self.bot.commands]
+            available_commands = self._get_available_commands()
             
-            # Find similar commands using difflib
-            similar_commands = difflib.get_close_matches(
-                attempted_command, 
-                available_commands, 
-                n=3,  # Number of suggestions
-                cutoff=0.6  # Similarity threshold (0-1)
-            )
+            if attempted_command in self._command_set:
+                # Only the case differed (e.g. !Play), so suggest the command itself
+                similar_commands = (attempted_command,)
+            else:
+                # Find similar commands using difflib, reusing results for repeat typos
+                similar_commands = suggest_commands(attempted_command, available_commands)
             
             # Create an embedded message
             embed = discord.Embed(
@@ -805,20 +1214,15 @@ class Music(commands.Cog):
             
             # Log the error
             logger.warning(
-                f"CommandNotFound: User {ctx.author} ({ctx.author.id}) "
-                f"attempted to use unknown command '{attempted_command}' "
-                f"in channel #{ctx.channel.name} ({ctx.channel.id})"
+                "CommandNotFound: User %s (%s) attempted to use unknown command '%s' "
+                "in channel #%s (%s)",
+                ctx.author, ctx.author.id, attempted_command, ctx.channel.name, ctx.channel.id
             )
             
             await ctx.send(embed=embed)
             
         elif isinstance(error, commands.MissingPermissions):
-            embed = discord.Embed(
-                title="Permission Error",
-                description="You don't have the required permissions to use this command.",
-                color=discord.Color.red()
-            )
-            await ctx.send(embed=embed)
+            await ctx.send(embed=PERMISSION_ERROR_EMBED)
             
         elif isinstance(error, commands.MissingRequiredArgument):
             embed = discord.Embed(
@@ -832,21 +1236,29 @@ class Music(commands.Cog):
                 inline=False
             )
             await ctx.send(embed=embed)
+
+        elif isinstance(error, commands.BadArgument):
+            # Raised when a typed argument (e.g. a skip amount) fails to convert
+            await ctx.send("❌ Please provide a valid number!")
             
         else:
             # Log unexpected errors
             logger.error(
-                f"Unexpected error in command '{ctx.command}' "
-                f"used by {ctx.author} ({ctx.author.id}): {str(error)}",
+                "Unexpected error in command '%s' used by %s (%s): %s",
+                ctx.command, ctx.author, ctx.author.id, error,
                 exc_info=error
             )
             
-            embed = discord.Embed(
-                title="An Error Occurred",
-                description="An unexpected error occurred. The bot administrator has been notified.",
-                color=discord.Color.red()
-            )
-            await ctx.send(embed=embed)
+            await ctx.send(embed=UNEXPECTED_ERROR_EMBED)
+
+    def cog_unload(self):
+        """Release resources held by the cog."""
+        for guild_id in list(self._prefetch_tasks):
+            self._discard_prefetched(guild_id)
+        self._meta_cache.close()
+        self._player_executor.shutdown(wait=False)
+        self.recommender.close()
                 
+
 async def setup(bot):
     await bot.add_cog(Music(bot))
\ No newline at end of file
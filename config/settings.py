@@ -29,10 +29,8 @@ YTDL_FORMAT_OPTIONS = {
     'no_warnings': True,
     'default_search': 'ytsearch2',
     'extract_flat': False,
-    # Network and quality options
+    # Network options
     'source_address': '0.0.0.0',
-    'preferredcodec': 'opus',
-    'preferredquality': '192',
     # # Added for stability
     # 'retries': 5,
     # 'fragment_retries': 5,
@@ -47,6 +45,9 @@ YTDL_FORMAT_OPTIONS = {
     'cookiefile': youtube_cookie_manager.get_cookie_file()
 }
 
+# For lookups that only want one track: a bare playlist URL resolves just its first entry
+YTDL_SINGLE_ENTRY_OPTIONS = {**YTDL_FORMAT_OPTIONS, 'playlist_items': '1'}
+
 INITIAL_PLAYLIST_YTDL_FORMAT_OPTIONS = {
     'format': 'bestaudio/best',
     'quiet': True,
@@ -57,13 +58,10 @@ INITIAL_PLAYLIST_YTDL_FORMAT_OPTIONS = {
     'lazy_playlist': False,  # Load full playlist
     'extract_flat': True,  # Only get basic info first
     'force_generic_extractor': False,
-    'flat_playlist': True,
     # 'verbose': True,
 
-    # Network and quality options
+    # Network options
     'source_address': '0.0.0.0',
-    'preferredcodec': 'opus',
-    'preferredquality': '192',
     
     # Authentication options
     'username': 'oauth',  # Use OAuth authentication
@@ -80,26 +78,6 @@ INITIAL_PLAYLIST_YTDL_FORMAT_OPTIONS = {
 }
 
 
-
-# INITIAL_PLAYLIST_YTDL_FORMAT_OPTIONS = {
-#     **YTDL_FORMAT_OPTIONS,
-#     'extract_flat': 'playlist',
-#     'playlist_items': '1-100',
-#     'ignore_no_formats_error': True,
-#     'ignoreerrors': True,
-#     'skip_download': True,
-#     'lazy_playlist': False,  # Load full playlist
-#     'force_generic_extractor': False,
-#     'extractor_args': {
-#         'youtube': {
-#             'skip': ['dash', 'hls'],
-#             'player_skip': ['webpage', 'js'],
-#             'player_client': ['android', 'web'],
-#         }
-#     }
-# }
-
-
 # Simplified FFmpeg options focusing on reliable audio playback
 FFMPEG_OPTIONS = {
     'before_options': (
@@ -119,6 +97,51 @@ FFMPEG_OPTIONS = {
     )
 }
 
-MAX_WORKERS = 5
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', 5))
+# Mostly network-bound extraction threads, so several per core by default
+YT_THREAD_POOL_SIZE = int(os.getenv('YT_THREAD_POOL_SIZE', min(64, 8 * (os.cpu_count() or 1))))
+PLAYER_WORKERS = max(2, min(4, os.cpu_count() or 1))  # Threads dedicated to player creation
 CHUNK_SIZE = 5
-MAX_SEARCH_RESULTS = 5
\ No newline at end of file
+PLAYLIST_BATCH_SIZE = 10  # Playlist entries resolved per batch
+QUEUE_DISPLAY_LIMIT = 100  # Upcoming tracks listed by !queue, 10 per embed
+MAX_SEARCH_RESULTS = 5
+PROGRESS_EDIT_INTERVAL = 1.5  # Minimum seconds between playlist progress edits
+
+# Track metadata cache
+META_CACHE_PATH = os.getenv('META_CACHE_PATH', os.path.join('.cache', 'yt_meta.sqlite3'))
+META_CACHE_SIZE = 1024
+META_CACHE_TTL = 24 * 60 * 60  # 24 hours in seconds
+
+# Last.fm similar-track cache
+SIMILAR_CACHE_SIZE = 256
+SIMILAR_CACHE_TTL = 60 * 60  # 1 hour in seconds
+
+# Last.fm track stats (listeners, playcount, tags, wiki) by artist and title
+TRACK_INFO_CACHE_SIZE = 2048
+TRACK_INFO_CACHE_TTL = 24 * 60 * 60  # 1 day in seconds
+
+# Resolved audio stream URLs, kept below the ~6 hour googlevideo signature expiry
+STREAM_CACHE_SIZE = 256
+STREAM_CACHE_TTL = 5 * 60 * 60  # 5 hours in seconds
+STREAM_VERIFY_AGE = 30 * 60  # Cached stream URLs older than this are checked before playback
+
+# YouTube search and playlist listings reused by YouTubeService
+YT_INFO_CACHE_SIZE = 2048
+YT_INFO_CACHE_TTL = 60 * 60  # 1 hour in seconds
+
+# Videos whose extraction failed, skipped for a while instead of being retried
+FAILED_URL_CACHE_SIZE = 4096
+FAILED_URL_CACHE_TTL = 15 * 60  # 15 minutes in seconds
+
+# Total time budget for one video's extraction, across all of its retries
+EXTRACTION_DEADLINE = 15  # seconds
+
+# Longest wait for one search result's stream lookup before it is dropped
+SEARCH_RESULT_TIMEOUT = 10  # seconds
+
+# Default total timeout for requests made through the bot's shared HTTP session
+HTTP_TIMEOUT = 15  # seconds
+
+# Per-guild !search results kept for !play <number>
+SEARCH_RESULTS_CACHE_SIZE = 256
+SEARCH_RESULTS_TTL = 10 * 60  # 10 minutes in seconds
@@ -1,13 +1,23 @@
+import ssl
 import asyncio
+import aiohttp
 import discord
 from discord.ext import commands
-from config.settings import TOKEN, COMMAND_PREFIX
+from config.settings import TOKEN, COMMAND_PREFIX, HTTP_TIMEOUT
 from config.logging_config import setup_logging
 from utils.resource_monitor import ResourceMonitor
+from services.worker_pool import shutdown_executors
 
+try:
+    import uvloop
+except ImportError:  # uvloop is optional and not available on Windows
+    uvloop = None
 
 logger = setup_logging()
 
+# Built once so every pooled connection reuses the same TLS context (and its session cache)
+SSL_CONTEXT = ssl.create_default_context()
+
 # Enable intents
 intents = discord.Intents.default()
 intents.message_content = True
@@ -23,12 +33,27 @@ async def load_extensions():
     await bot.load_extension('cogs.music')
 
 async def main():
-    async with bot:
-        await load_extensions()
-        await bot.start(TOKEN)
-    # In your bot's setup
+    # Sample CPU/memory in a background task instead of on every extraction
     monitor = ResourceMonitor()
     monitor.start()
 
+    # One pooled HTTP session shared by everything in the bot, closed on shutdown
+    connector = aiohttp.TCPConnector(
+        ssl=SSL_CONTEXT, limit=100, limit_per_host=20, ttl_dns_cache=600, keepalive_timeout=75
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http_session, bot:
+            bot.http_session = http_session
+            await load_extensions()
+            await bot.start(TOKEN)
+    finally:
+        monitor.stop()
+        # The shared extraction pool outlives cog reloads, so it is shut down here
+        shutdown_executors()
+
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -1,9 +1,11 @@
-import uuid
-from collections import deque
+import asyncio
+import inspect
+from collections import deque, defaultdict
+from itertools import islice
 from dataclasses import dataclass
-from typing import Optional, Dict, Callable
+from typing import Optional, Dict, DefaultDict, Callable, Any, Iterable
 
-@dataclass
+@dataclass(slots=True)
 class Track:
     title: str
     url: str  # webpage URL
@@ -11,7 +13,26 @@ class Track:
     thumbnail: Optional[str] = None
     stream_url: Optional[str] = None  # Direct audio stream URL
 
-@dataclass
+
+def track_from_info(info: Dict) -> Track:
+    """
+    Build a Track from a track info dict, keeping only the fields a Track stores
+    
+    Args:
+        info (Dict): Track info from the YouTube service, a playlist entry or the metadata cache
+        
+    Returns:
+        Track: A track holding no reference to the (possibly large) info dict
+    """
+    return Track(
+        title=info['title'],
+        url=info.get('webpage_url') or info['url'],
+        duration=info.get('duration') or 0,
+        thumbnail=info.get('thumbnail'),
+        stream_url=info.get('stream_url')
+    )
+
+@dataclass(slots=True)
 class PlaylistLoader:
     """Manages the state of playlist loading"""
     current_index: int = 0
@@ -19,17 +40,19 @@ class PlaylistLoader:
     total_tracks: int = 0
     is_loading: bool = False
     url: str = ""  # Store playlist URL for continued loading
+    progress_message: Any = None  # Discord message edited with loading progress
+    last_progress_edit: float = 0.0  # Monotonic time of the last progress edit
 
     def __post_init__(self):
         if self.video_entries is None:
             self.video_entries = []
 
 
-@dataclass
+@dataclass(slots=True)
 class QueueItem:
     """Wrapper for Track with callback support"""
     track: Track
-    callback_id: Optional[str] = None
+    on_start: Optional[Callable] = None  # Called when the track is taken off the queue
 
 class MusicQueue:
     def __init__(self):
@@ -38,7 +61,7 @@ class MusicQueue:
         self.is_playing: bool = False
         self.playlist_processing: bool = False
         self.playlist_loader: Optional[PlaylistLoader] = None
-        self._callbacks: Dict[str, Callable] = {}
+        self._callback_tasks: set[asyncio.Task] = set()  # Running async track callbacks
 
     def add_track(self, track: Track, on_start: Optional[Callable] = None) -> None:
         """
@@ -46,14 +69,19 @@ class MusicQueue:
         
         Args:
             track (Track): The track to add to the queue
-            on_start (Optional[Callable]): Callback function to execute when track starts playing
+            on_start (Optional[Callable]): Callback function to execute when track starts playing;
+                coroutine functions are scheduled as tasks instead of blocking the caller
+        """
+        self.queue.append(QueueItem(track=track, on_start=on_start))
+
+    def add_tracks(self, tracks: Iterable[Track]) -> None:
         """
-        callback_id = str(uuid.uuid4()) if on_start else None
-        if callback_id:
-            self._callbacks[callback_id] = on_start
+        Add several tracks to the end of the queue in a single operation
         
-        queue_item = QueueItem(track=track, callback_id=callback_id)
-        self.queue.append(queue_item)
+        Args:
+            tracks (Iterable[Track]): The tracks to add to the queue
+        """
+        self.queue.extend(QueueItem(track=track) for track in tracks)
 
     def skip_tracks(self, amount: int = 1) -> tuple[int, Optional[Track]]:
         """
@@ -77,12 +105,8 @@ class MusicQueue:
         # Execute callbacks for all skipped tracks
         for _ in range(actual_skip):
             queue_item = self.queue.popleft()
-            if queue_item.callback_id and queue_item.callback_id in self._callbacks:
-                callback = self._callbacks.pop(queue_item.callback_id)
-                try:
-                    callback()
-                except Exception as e:
-                    print(f"Error executing track callback: {e}")
+            if queue_item.on_start:
+                self._run_callback(queue_item.on_start)
         
         # Calculate total tracks skipped (including current track)
         tracks_skipped = actual_skip + 1 if self.current_track else actual_skip
@@ -95,23 +119,41 @@ class MusicQueue:
             return None
             
         queue_item = self.queue.popleft()
-        if queue_item.callback_id and queue_item.callback_id in self._callbacks:
-            callback = self._callbacks.pop(queue_item.callback_id)
-            try:
-                callback()
-            except Exception as e:
-                # Handle or log callback errors
-                print(f"Error executing track callback: {e}")
+        if queue_item.on_start:
+            self._run_callback(queue_item.on_start)
         
         return queue_item.track
 
+    def _run_callback(self, callback: Callable) -> None:
+        """Run a track callback, scheduling it as a task if it returns an awaitable"""
+        try:
+            result = callback()
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._callback_tasks.add(task)
+                task.add_done_callback(self._callback_tasks.discard)
+        except Exception as e:
+            # Handle or log callback errors
+            print(f"Error executing track callback: {e}")
+
+    def preview(self, limit: int = 10) -> list[tuple[str, int]]:
+        """
+        Get the title and duration of the next tracks without copying the queue
+        
+        Args:
+            limit (int): Maximum number of upcoming tracks to return (default: 10)
+            
+        Returns:
+            list[tuple[str, int]]: (title, duration) pairs in queue order
+        """
+        return [(item.track.title, item.track.duration) for item in islice(self.queue, limit)]
+
     def clear(self) -> None:
         """Clear the queue and reset all states"""
         self.queue.clear()
         self.current_track = None
         self.is_playing = False
         self.playlist_loader = None
-        self._callbacks.clear()
 
     def start_playlist_loading(self, playlist_url: str) -> None:
         """Initialize playlist loading state"""
@@ -138,13 +180,10 @@ class MusicQueue:
 
 class QueueManager:
     def __init__(self):
-        self._queues: Dict[int, MusicQueue] = {}
+        self._queues: DefaultDict[int, MusicQueue] = defaultdict(MusicQueue)
 
     def get_queue(self, guild_id: int) -> MusicQueue:
-        if guild_id not in self._queues:
-            self._queues[guild_id] = MusicQueue()
         return self._queues[guild_id]
 
     def remove_queue(self, guild_id: int) -> None:
-        if guild_id in self._queues:
-            del self._queues[guild_id]
\ No newline at end of file
+        self._queues.pop(guild_id, None)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import os
+import asyncio
+import random
+import traceback
+import platform
+import itertools
+import threading
+import weakref
+import psutil
+from typing import Optional, Dict, Callable, Awaitable, Any
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import (
+    FAILED_URL_CACHE_SIZE, FAILED_URL_CACHE_TTL, EXTRACTION_DEADLINE, YT_THREAD_POOL_SIZE
+)
+from utils.metadata_cache import TTLCache
+import logging
+
+try:
+    from pytubefix.exceptions import VideoUnavailable
+except ImportError:  # Only the pytubefix service raises it
+    VideoUnavailable = None
+
+logger = logging.getLogger('music_bot')
+
+# The bot's own process, looked up once rather than by every worker
+_PROCESS = psutil.Process()
+
+class AgeRestrictedError(Exception):
+    pass
+
+# Extraction error text for failures that a retry won't fix; specific phrases only, since
+# transient errors such as "HTTP Error 503: Service Unavailable" must still be retried
+PERMANENT_ERROR_MARKERS = (
+    'age restricted', 'age-restricted', 'private video',
+    'video unavailable', 'this video is unavailable'
+)
+
+def is_permanent_error(error: Exception) -> bool:
+    """Whether an extraction error is permanent (restricted, private or removed video)."""
+    permanent_types = (AgeRestrictedError, VideoUnavailable) if VideoUnavailable else AgeRestrictedError
+    if isinstance(error, permanent_types):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in PERMANENT_ERROR_MARKERS)
+
+def retry_delay(attempt: int, cap: float = 30) -> float:
+    """Exponential backoff with jitter to wait after the given failed attempt (1-based)."""
+    return min(2 ** (attempt - 1), cap) + random.random() / 2
+
+# Set by the first worker of any pool, so process-wide limits are applied once per process
+_process_limits_applied = False
+_process_limits_lock = threading.Lock()
+
+def _claim_process_limits() -> bool:
+    """Whether the caller is the first worker in the process, and so applies process-wide limits."""
+    global _process_limits_applied
+    with _process_limits_lock:
+        if _process_limits_applied:
+            return False
+        _process_limits_applied = True
+        return True
+
+def set_worker_limits(worker_index: Optional[int] = None):
+    """Set resource limits for the calling worker thread, once when it starts."""
+    try:
+        # Set CPU affinity to avoid using all cores
+        process = _PROCESS
+        # Use half of available CPUs, but at least one
+        num_cpus = max(1, psutil.cpu_count() // 2)
+        # Settings below that apply to the whole process only need the first worker of
+        # the first pool; worker indexes restart in every pool, so they can't tell
+        first_worker = _claim_process_limits()
+        
+        # Pin each worker to one of those cores, round-robin; 0 targets the calling thread
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                cpus = {worker_index % num_cpus} if worker_index is not None else set(range(num_cpus))
+                os.sched_setaffinity(0, cpus)
+            except Exception as e:
+                logger.warning(f"Could not set CPU affinity: {e}")
+        elif first_worker and hasattr(process, 'cpu_affinity'):
+            try:
+                process.cpu_affinity(list(range(num_cpus)))
+            except Exception as e:
+                logger.warning(f"Could not set CPU affinity: {e}")
+
+        # Set process priority
+        if platform.system() == 'Windows':
+            if first_worker:
+                try:
+                    process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+                except Exception as e:
+                    logger.warning(f"Could not set process priority on Windows: {e}")
+        else:
+            try:
+                os.nice(10)  # Lowers only the calling thread's priority on Linux
+            except Exception as e:
+                logger.warning(f"Could not set process priority on Unix: {e}")
+
+        # Set IO priority if supported
+        if first_worker and hasattr(psutil, 'IOPRIO_CLASS_BE'):  # Linux
+            try:
+                process.ionice(psutil.IOPRIO_CLASS_BE)
+            except Exception as e:
+                logger.warning(f"Could not set IO priority on Linux: {e}")
+        elif first_worker and hasattr(psutil, 'IOPRIO_LOW'):  # Windows
+            try:
+                process.ionice(psutil.IOPRIO_LOW)
+            except Exception as e:
+                logger.warning(f"Could not set IO priority on Windows: {e}")
+
+    except Exception as e:
+        logger.warning(f"Could not set all resource limits: {e}")
+
+# Live worker pools, shut down together at exit without keeping them alive
+_executors: 'weakref.WeakSet[ResourceLimitedThreadPoolExecutor]' = weakref.WeakSet()
+
+class ResourceLimitedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor with resource limits."""
+    def __init__(self, max_workers=None, thread_name_prefix=''):
+        self._worker_ids = itertools.count()
+        super().__init__(
+            max_workers,
+            thread_name_prefix=thread_name_prefix,
+            initializer=self._init_worker
+        )
+        self._shutdown_event = threading.Event()  # Event to signal shutdown
+        _executors.add(self)
+
+    def _init_worker(self):
+        """Apply resource limits once per worker thread instead of per task."""
+        set_worker_limits(next(self._worker_ids))
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """Shutdown the thread pool."""
+        logger.info("Shutting down the thread pool executor")
+        self._shutdown_event.set()  # Signal shutdown
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+# The process-wide extraction pool, created by the first service that needs it
+_shared_pool: Optional[ResourceLimitedThreadPoolExecutor] = None
+
+def get_shared_pool() -> ResourceLimitedThreadPoolExecutor:
+    """Get the process-wide worker pool, creating it on first use."""
+    global _shared_pool
+    if _shared_pool is None:
+        # Extraction threads spend nearly all their time waiting on the network, so the
+        # pool is sized for concurrent requests rather than by CPU cores or RAM
+        _shared_pool = ResourceLimitedThreadPoolExecutor(
+            max_workers=YT_THREAD_POOL_SIZE,
+            thread_name_prefix='yt_worker'
+        )
+    return _shared_pool
+
+def shutdown_executors():
+    """Shut down every worker pool still alive; called once when the bot exits."""
+    for executor in list(_executors):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class WorkerPoolMixin:
+    """
+    Worker pool and retrying extraction shared by the YouTube services.
+
+    Services call _init_pool() from __init__ and run blocking calls through
+    _run_in_pool(), so the pool's concurrency bound and the retry rules live here.
+    """
+    def _init_pool(self, loop) -> None:
+        """Attach to the shared worker pool and set up its concurrency bound and the failed-URL cache."""
+        self._loop = loop
+        self.thread_pool = get_shared_pool()
+        # Make the pool the loop's default too, so run_in_executor(None, ...) calls elsewhere
+        # share its threads instead of spawning a second pool; it lives until the bot exits
+        loop.set_default_executor(self.thread_pool)
+        # Callers wait here for a free worker rather than piling work onto the pool's queue
+        self._pool_sem = asyncio.Semaphore(YT_THREAD_POOL_SIZE)
+        self._failed_urls = TTLCache(max_size=FAILED_URL_CACHE_SIZE, ttl=FAILED_URL_CACHE_TTL)
+
+    async def _run_in_pool(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the worker pool once a worker is free."""
+        await self._pool_sem.acquire()
+        try:
+            future = self.thread_pool.submit(func, *args, **kwargs)
+        except BaseException:
+            self._pool_sem.release()
+            raise
+        # Free the slot when the worker is done, not when the caller stops waiting: a call
+        # that is cancelled or times out once running keeps its thread busy until it returns
+        future.add_done_callback(self._release_pool_slot)
+        # Cancelling the caller cancels the pool future too, if it hasn't started yet
+        return await asyncio.wrap_future(future, loop=self._loop)
+
+    def _release_pool_slot(self, _future) -> None:
+        """Hand a pool slot back to the event loop from the worker thread."""
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._pool_sem.release)
+
+    async def _extract_with_retries(self, url: str, semaphore: asyncio.Semaphore,
+                                    fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """Await fetch() for a URL, retrying with backoff; None if every attempt fails."""
+        # Known-bad videos (removed, blocked, age-restricted) are skipped without retrying
+        if self._failed_urls.get(url):
+            logger.info(f"Skipping recently failed URL: {url}")
+            return None
+
+        async with semaphore:
+            tries = 0
+            max_tries = 3
+            timeout_duration = 5
+            # Attempts share one time budget, so a slow video can't hold up the caller for long
+            deadline = self._loop.time() + EXTRACTION_DEADLINE
+
+            while tries < max_tries:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    logger.error(f"Gave up extracting video info for URL: {url} after {EXTRACTION_DEADLINE}s")
+                    break
+                try:
+                    return await asyncio.wait_for(fetch(), timeout=min(timeout_duration, remaining))
+
+                except asyncio.TimeoutError:
+                    tries += 1
+                    logger.error(f"TimeoutError extracting video info for URL: {url}. Attempt {tries} of {max_tries}.")
+                    timeout_duration *= 2
+                except asyncio.CancelledError:
+                    logger.error(f"CancelledError while extracting video info for URL: {url}.")
+                    raise
+                except Exception as e:
+                    if is_permanent_error(e):
+                        logger.error(f"Video cannot be played, not retrying: {str(e)} | for url: {url}")
+                        # Only a permanent failure is remembered; after timeouts or other
+                        # transient errors the URL is tried again on the next request
+                        self._failed_urls.set(url, True)
+                        break
+                    tries += 1
+                    logger.error(f"Error extracting video info: {str(e)} | for url: {url}")
+                    logger.error(f"Full traceback: {traceback.format_exc()}")
+                if tries < max_tries:
+                    await asyncio.sleep(min(retry_delay(tries), max(0, deadline - self._loop.time())))
+
+            return None
@@ -1,102 +1,18 @@
-import platform
+import time
 import asyncio
-import signal
-import psutil
-import traceback
-import sys
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Callable, Awaitable, Any
 from pytubefix import YouTube, Playlist, Search
-from concurrent.futures import ThreadPoolExecutor
-import threading
 import logging
 from urllib.parse import urlparse, parse_qs
+from config.settings import (
+    YT_INFO_CACHE_SIZE, YT_INFO_CACHE_TTL, SEARCH_RESULT_TIMEOUT,
+    YT_THREAD_POOL_SIZE, STREAM_CACHE_TTL
+)
+from utils.metadata_cache import TTLCache, extract_video_id
+from services.worker_pool import AgeRestrictedError, WorkerPoolMixin
 
 logger = logging.getLogger('music_bot')
 
-class AgeRestrictedError(Exception):
-    pass
-
-def set_worker_limits():
-    """Set resource limits for worker threads."""
-    try:
-        process = psutil.Process()
-        num_cpus = max(1, psutil.cpu_count() // 2)
-        
-        if hasattr(process, 'cpu_affinity'):
-            try:
-                process.cpu_affinity(list(range(num_cpus)))
-            except Exception as e:
-                logger.warning(f"Could not set CPU affinity: {e}")
-
-        if platform.system() == 'Windows':
-            try:
-                process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
-            except Exception as e:
-                logger.warning(f"Could not set process priority on Windows: {e}")
-        else:
-            try:
-                process.nice(10)
-            except Exception as e:
-                logger.warning(f"Could not set process priority on Unix: {e}")
-
-        if hasattr(psutil, 'IOPRIO_CLASS_BE'):
-            try:
-                process.ionice(psutil.IOPRIO_CLASS_BE)
-            except Exception as e:
-                logger.warning(f"Could not set IO priority on Linux: {e}")
-        elif hasattr(psutil, 'IOPRIO_LOW'):
-            try:
-                process.ionice(psutil.IOPRIO_LOW)
-            except Exception as e:
-                logger.warning(f"Could not set IO priority on Windows: {e}")
-
-    except Exception as e:
-        logger.warning(f"Could not set all resource limits: {e}")
-
-class ResourceLimitedThreadPoolExecutor(ThreadPoolExecutor):
-    """ThreadPoolExecutor with resource limits."""
-    def __init__(self, max_workers=None, thread_name_prefix=''):
-        super().__init__(max_workers, thread_name_prefix=thread_name_prefix)
-        self._active_tasks = 0
-        self._lock = threading.Lock()
-        self._memory_threshold = 500 * 1024 * 1024  # 500MB
-        self._shutdown_event = threading.Event()
-
-    def submit(self, fn, *args, **kwargs):
-        with self._lock:
-            if self._active_tasks >= self._max_workers:
-                logger.warning("Thread pool at maximum capacity")
-                raise RuntimeError("Thread pool overwhelmed")
-                
-            process = psutil.Process()
-            memory_use = process.memory_info().rss
-            if memory_use > self._memory_threshold:
-                logger.warning(f"High memory usage: {memory_use / 1024 / 1024:.2f}MB")
-                
-            self._active_tasks += 1
-        
-        future = super().submit(self._wrapped_fn, fn, *args, **kwargs)
-        future.add_done_callback(self._task_done)
-        return future
-
-    def _wrapped_fn(self, fn, *args, **kwargs):
-        set_worker_limits()
-        return fn(*args, **kwargs)
-
-    def _task_done(self, future):
-        with self._lock:
-            self._active_tasks -= 1
-
-    def shutdown(self, wait=True):
-        logger.info("Shutting down the thread pool executor")
-        self._shutdown_event.set()
-        super().shutdown(wait=wait)
-
-def signal_handler(signal, frame, executor):
-    logger.info("Caught Ctrl+C! Attempting to shut down gracefully...")
-    executor.shutdown(wait=True)
-    sys.exit(0)
-
 def on_progress(stream, chunk, bytes_remaining):
     """Callback function for download progress."""
     total_size = stream.filesize
@@ -104,56 +20,59 @@ def on_progress(stream, chunk, bytes_remaining):
     percentage = (bytes_downloaded / total_size) * 100
     logger.debug(f"Download Progress: {percentage:.2f}%")
 
-class YouTubeService:
+class YouTubeService(WorkerPoolMixin):
     def __init__(self, bot):
         self.bot = bot
         
-        cpu_count = psutil.cpu_count()
-        memory_gb = psutil.virtual_memory().total / (1024 ** 3)
-        
-        max_workers = min(
-            10,  # Maximum workers (adjusted from MAX_WORKERS constant)
-            max(1, cpu_count // 2),
-            max(1, int(memory_gb))
-        )
-        
-        logger.info(f"Initializing YouTube service with {max_workers} workers")
-        
-        self.thread_pool = ResourceLimitedThreadPoolExecutor(
-            max_workers=max_workers,
-            thread_name_prefix='yt_worker'
-        )
-        
-        signal.signal(signal.SIGINT, lambda s, f: signal_handler(s, f, self.thread_pool))
+        logger.info(f"Initializing YouTube service with {YT_THREAD_POOL_SIZE} workers")
+        self._init_pool(bot.loop)
         self._extraction_semaphore = asyncio.Semaphore(3)
+        # Search results, playlist listings and per-video info, keyed by kind
+        self._info_cache = TTLCache(max_size=YT_INFO_CACHE_SIZE, ttl=YT_INFO_CACHE_TTL)
+
+    async def _cached_call(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for a key, or await the factory and cache a non-empty result."""
+        cached = self._info_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = await factory()
+        if result:
+            self._info_cache.set(key, result)
+        return result
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Forget cached info for a video or playlist URL, or every cached result if no URL is given."""
+        if url is None:
+            self._info_cache.clear()
+        else:
+            self._info_cache.delete(f'playlist:{url}')
+            self._info_cache.delete(f'video:{extract_video_id(url) or url}')
 
-    def _monitor_resources(self):
-        """Monitor system resource usage."""
-        process = psutil.Process()
-        memory_use = process.memory_info().rss
-        cpu_percent = process.cpu_percent()
-
-        if memory_use > 500 * 1024 * 1024:
-            logger.warning(f"High memory usage: {memory_use / 1024 / 1024:.2f}MB")
-        if cpu_percent > 70:
-            logger.warning(f"High CPU usage: {cpu_percent}%")
-
-        return memory_use, cpu_percent
-
-    async def extract_info(self, url, loop):
+    async def extract_info(self, url):
         """Extract information with resource limits."""
         async with self._extraction_semaphore:
-            self._monitor_resources()
             try:
-                return await loop.run_in_executor(
-                    self.thread_pool,
-                    lambda: self._get_video_info(url)
-                )
+                return await self._video_info(url)
             except Exception as e:
                 if "age restricted" in str(e).lower():
                     raise AgeRestrictedError("This video is age-restricted and cannot be played.")
                 raise
 
+    async def _video_info(self, url: str) -> Dict:
+        """Get video info on the worker pool, reusing a recent lookup of the same video."""
+        key = f'video:{extract_video_id(url) or url}'
+        cached = self._info_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        info = await self._run_in_pool(self._get_video_info, url)
+        if info:
+            # The info carries a signed stream URL, so don't keep it past that URL's expiry
+            self._info_cache.set(key, info, expires=time.time() + STREAM_CACHE_TTL)
+            return dict(info)
+        return info
+
     def _get_video_info(self, url: str) -> Dict:
         """Get video information using pytubefix."""
         yt = YouTube(url, use_oauth=True, allow_oauth_cache=True, on_progress_callback=on_progress)
@@ -168,40 +87,7 @@ class YouTubeService:
         }
 
     async def extract_video_info(self, url: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
-        async with semaphore:
-            self._monitor_resources()
-            tries = 0
-            max_tries = 2
-            timeout_duration = 5
-            
-            while tries < max_tries:
-                try:
-                    info = await asyncio.wait_for(
-                        self.bot.loop.run_in_executor(
-                            None,
-                            lambda: self._get_video_info(url)
-                        ),
-                        timeout=timeout_duration
-                    )
-
-                    if info:
-                        return info
-                    return None
-
-                except asyncio.TimeoutError:
-                    tries += 1
-                    logger.error(f"TimeoutError extracting video info for URL: {url}. Attempt {tries} of {max_tries}.")
-                    timeout_duration *= 2
-                except asyncio.CancelledError:
-                    logger.error(f"CancelledError while extracting video info for URL: {url}.")
-                    raise
-                except Exception as e:
-                    tries += 1
-                    logger.error(f"Error extracting video info: {str(e)} | for url: {url}")
-                    logger.error(f"Full traceback: {traceback.format_exc()}")
-                await asyncio.sleep(1)
-
-            return None
+        return await self._extract_with_retries(url, semaphore, lambda: self._video_info(url))
 
     async def process_url(self, query: str) -> Optional[Dict]:
         """Process a single URL or search query."""
@@ -212,56 +98,73 @@ class YouTubeService:
                     return None
                 return search_results[0]
             
-            return await asyncio.get_event_loop().run_in_executor(
-                self.thread_pool,
-                lambda: self._get_video_info(query)
-            )
+            return await self._video_info(query)
             
         except Exception as e:
             logger.error(f"Error processing URL: {str(e)}")
             raise
 
     async def get_playlist_info(self, url: str) -> Tuple[List[Dict], int]:
-        """Get information about all videos in a playlist."""
+        """
+        Get the video URLs of a playlist.
+
+        Only the playlist pages are fetched here; per-video metadata is
+        resolved batch by batch as the playlist is queued, so playback can
+        start without waiting for every video in the playlist.
+        """
         try:
-            playlist = await asyncio.get_event_loop().run_in_executor(
-                self.thread_pool,
-                lambda: Playlist(url)
+            video_urls = await self._cached_call(
+                f'playlist:{url}',
+                lambda: self._run_in_pool(lambda: list(Playlist(url).video_urls))
             )
             
-            videos = []
-            for video_url in playlist.video_urls:
-                try:
-                    info = await self.extract_info(video_url, self.bot.loop)
-                    if info:
-                        videos.append(info)
-                except Exception as e:
-                    logger.error(f"Error extracting playlist video info: {str(e)}")
-                    continue
-            
+            videos = [{'url': video_url} for video_url in video_urls]
             return videos, len(videos)
             
         except Exception as e:
             logger.error(f"Error getting playlist info: {str(e)}")
             raise
 
+    async def parallel_search(self, query: str, max_results: int = 5) -> List[Dict]:
+        """Search for videos; kept for callers of the original service's search API."""
+        return await self.search_videos(query, max_results)
+
     async def search_videos(self, query: str, max_results: int = 5) -> List[Dict]:
+        """Search for videos on YouTube, reusing recent results for the same query."""
+        normalized = ' '.join(query.lower().split())
+        videos = await self._cached_call(
+            f'search:{max_results}:{normalized}',
+            lambda: self._search_videos(query, max_results)
+        )
+        # Hand out copies so callers cannot alter the cached results
+        return [dict(video) for video in videos]
+
+    async def _search_videos(self, query: str, max_results: int) -> List[Dict]:
         """Search for videos on YouTube."""
         try:
-            search_results = await asyncio.get_event_loop().run_in_executor(
-                self.thread_pool,
+            search_results = await self._run_in_pool(
                 lambda: Search(query).results[:max_results]
             )
             
+            # Each result needs its own stream lookup; run them concurrently on the pool
+            # and let a blocked or slow video drop out instead of failing the search
+            results = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        self._run_in_pool(self._format_track_info, video),
+                        timeout=SEARCH_RESULT_TIMEOUT
+                    )
+                    for video in search_results
+                ),
+                return_exceptions=True
+            )
+
             videos = []
-            for video in search_results:
-                try:
-                    info = self._format_track_info(video)
-                    if info:
-                        videos.append(info)
-                except Exception as e:
-                    logger.error(f"Error formatting search result: {str(e)}")
-                    continue
+            for info in results:
+                if isinstance(info, Exception):
+                    logger.error(f"Error formatting search result: {info!r}")
+                elif info:
+                    videos.append(info)
                     
             return videos
             
@@ -283,10 +186,3 @@ class YouTubeService:
         except Exception as e:
             logger.error(f"Error formatting track info: {str(e)}")
             return None
-
-    def __del__(self):
-        """Cleanup resources."""
-        try:
-            self.thread_pool.shutdown()
-        except Exception as e:
-            logger.error(f"Error shutting down thread pool: {e}")
\ No newline at end of file
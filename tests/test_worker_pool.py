@@ -0,0 +1,32 @@
+import unittest
+
+from services.worker_pool import AgeRestrictedError, is_permanent_error
+
+
+class IsPermanentErrorTest(unittest.TestCase):
+    def test_removed_private_and_restricted_videos_are_permanent(self):
+        for message in (
+            'ERROR: [youtube] abc: Video unavailable',
+            'This video is unavailable',
+            'Private video. Sign in if you have been granted access',
+            'Video is age restricted',
+        ):
+            with self.subTest(message=message):
+                self.assertTrue(is_permanent_error(Exception(message)))
+
+    def test_age_restricted_error_type_is_permanent(self):
+        self.assertTrue(is_permanent_error(AgeRestrictedError('cannot be played')))
+
+    def test_transient_errors_are_retried(self):
+        for message in (
+            'HTTP Error 503: Service Unavailable',
+            'Service temporarily unavailable',
+            'HTTP Error 429: Too Many Requests',
+            'timed out',
+        ):
+            with self.subTest(message=message):
+                self.assertFalse(is_permanent_error(Exception(message)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import discord
 import asyncio
+import threading
 from yt_dlp import YoutubeDL
+from utils.metadata_cache import youtube_ie_key
 import logging
 
 logger = logging.getLogger('music_bot')
@@ -32,6 +34,26 @@ STREAM_OPTIONS = {
     }
 }
 
+# One YoutubeDL per thread: building one loads every extractor, and instances
+# shouldn't be shared between concurrent extractions
+_tls = threading.local()
+
+def _get_ytdl() -> YoutubeDL:
+    """Get the calling thread's streaming YoutubeDL instance, creating it on first use."""
+    ytdl = getattr(_tls, 'ytdl', None)
+    if ytdl is None:
+        ytdl = YoutubeDL(STREAM_OPTIONS)
+        _tls.ytdl = ytdl
+    return ytdl
+
+def _extract(url: str, download: bool = False) -> dict:
+    """Extract info with the calling thread's streaming YoutubeDL instance."""
+    # A plain video URL goes straight to the YouTube extractor, skipping the
+    # URL match against every registered extractor
+    return _get_ytdl().extract_info(
+        url, download=download, ie_key=youtube_ie_key(url)
+    )
+
 class DirectAudioSource(discord.PCMVolumeTransformer):
     def __init__(self, source, *, data, volume=0.5):
         super().__init__(discord.FFmpegOpusAudio(source), volume)
@@ -44,43 +66,34 @@ class DirectAudioSource(discord.PCMVolumeTransformer):
     @classmethod
     async def from_url(cls, url, *, loop=None, stream=True):
         loop = loop or asyncio.get_event_loop()
-        ytdl = YoutubeDL(STREAM_OPTIONS)
 
         try:
-            data = await loop.run_in_executor(None, lambda: ytdl.extract_info(url, download=not stream))
+            data = await loop.run_in_executor(None, lambda: _extract(url, download=not stream))
             
             if 'entries' in data:
                 data = data['entries'][0]
 
-            # Try to find the best opus format (Discord's native format)
-            formats = data.get('formats', [])
+            # Take the first opus format (Discord's native format); until one turns up,
+            # track the best audio-only format so no second pass is needed
             best_format = None
-            
-            # First try to find opus format
-            for f in formats:
-                if f.get('acodec') == 'opus':
+            best_rank = None
+            for f in data.get('formats', []):
+                acodec = f.get('acodec')
+                if acodec == 'opus':
                     best_format = f
                     break
-            
-            # If no opus, try to find any audio-only format
-            if not best_format:
-                audio_formats = [
-                    f for f in formats
-                    if f.get('acodec') != 'none' and f.get('vcodec') in ['none', None]
-                ]
-                if audio_formats:
-                    best_format = max(
-                        audio_formats,
-                        key=lambda x: (
-                            x.get('abr', 0),
-                            x.get('asr', 0),
-                            -x.get('filesize', float('inf'))
-                        )
-                    )
+                if acodec != 'none' and f.get('vcodec') in ('none', None):
+                    rank = (f.get('abr') or 0, f.get('asr') or 0, -(f.get('filesize') or float('inf')))
+                    if best_rank is None or rank > best_rank:
+                        best_format, best_rank = f, rank
 
-            stream_url = best_format['url'] if best_format else data['url']
-            logger.info(f"Selected format: {best_format.get('format_id')} "
-                       f"(codec: {best_format.get('acodec')})")
+            if best_format:
+                stream_url = best_format['url']
+                logger.info(f"Selected format: {best_format.get('format_id')} "
+                           f"(codec: {best_format.get('acodec')})")
+            else:
+                stream_url = data['url']
+                logger.info("Using default stream URL")
 
             # Create audio source using Discord's native audio system
             audio_source = await discord.FFmpegOpusAudio.from_probe(
@@ -99,8 +112,7 @@ class DirectAudioSource(discord.PCMVolumeTransformer):
     def prepare_stream_url(url):
         """Prepare a stream URL for direct playback."""
         try:
-            ytdl = YoutubeDL(STREAM_OPTIONS)
-            info = ytdl.extract_info(url, download=False)
+            info = _extract(url, download=False)
             
             if 'entries' in info:
                 info = info['entries'][0]
@@ -0,0 +1,228 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Hashable
+from urllib.parse import urlparse, parse_qs
+import logging
+
+logger = logging.getLogger('music_bot')
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Extract the YouTube video ID from a watch or youtu.be URL.
+
+    Args:
+        url (str): The URL to parse
+
+    Returns:
+        Optional[str]: The video ID, or None if the URL is not a video URL
+    """
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    host = parsed.netloc.lower()
+    if host.endswith('youtu.be'):
+        video_id = parsed.path.lstrip('/').split('/')[0]
+        return video_id or None
+    if host.endswith('youtube.com'):
+        if parsed.path == '/watch':
+            return parse_qs(parsed.query).get('v', [None])[0]
+        if parsed.path.startswith(('/shorts/', '/embed/')):
+            return parsed.path.split('/')[2] or None
+    return None
+
+
+def youtube_ie_key(url: str) -> Optional[str]:
+    """
+    Get the yt-dlp extractor key for a URL that names a single YouTube video.
+
+    Forcing the key skips yt-dlp's match against every extractor. URLs with a
+    list parameter are left to normal dispatch: the YouTube video extractor
+    rejects them, and noplaylist resolves them to the single video.
+
+    Args:
+        url (str): The URL to extract
+
+    Returns:
+        Optional[str]: 'Youtube', or None to let yt-dlp pick the extractor
+    """
+    if not extract_video_id(url):
+        return None
+    if 'list' in parse_qs(urlparse(url).query):
+        return None
+    return 'Youtube'
+
+
+def metadata_key(query: str) -> Optional[str]:
+    """
+    Build the metadata cache key for a URL or search query.
+
+    Video URLs are keyed by their video ID so that playlist and timestamp
+    parameters do not split the cache; search queries are keyed by their
+    case- and whitespace-normalized text.
+
+    Args:
+        query (str): A URL or free-text search query
+
+    Returns:
+        Optional[str]: The cache key, or None for URLs that are not videos
+    """
+    if query.startswith('http'):
+        return extract_video_id(query)
+    normalized = ' '.join(query.lower().split())
+    return f'search:{normalized}' if normalized else None
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires, value = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, expires: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries beyond max_size."""
+        if expires is None:
+            expires = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MetadataCache:
+    """
+    Two-tier cache (in-memory LRU + SQLite) of track info keyed by video ID.
+
+    Only the in-memory tier is used on the caller's thread. SQLite reads and
+    writes run on one dedicated thread, so a disk commit never blocks the event
+    loop and the database is only touched from that thread.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 24 * 3600, db_path: Optional[str] = None):
+        self.ttl = ttl
+        self._memory = TTLCache(max_size=max_size, ttl=ttl)
+        self._db = None
+        self._executor = None
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS track_info '
+                    '(video_id TEXT PRIMARY KEY, expires REAL, data TEXT)'
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not open metadata cache database: {e}")
+                self._db = None
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='meta_cache')
+
+    async def get(self, video_id: str) -> Optional[Dict]:
+        """Return cached track info for a video ID, or None on a miss."""
+        data = self._memory.get(video_id)
+        if data is not None or not self._executor:
+            return data
+
+        row = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._read, video_id
+        )
+        if not row or row[0] <= time.time():
+            return None
+
+        data = json.loads(row[1])
+        self._memory.set(video_id, data, expires=row[0])
+        return data
+
+    def set(self, video_id: str, data: Dict) -> None:
+        """Store track info for a video ID in both tiers; the disk write happens in the background."""
+        # Stream URLs expire long before the cache entry does, so never cache them
+        data = {key: value for key, value in data.items() if key != 'stream_url'}
+        expires = time.time() + self.ttl
+        self._memory.set(video_id, data, expires=expires)
+        self._submit(
+            'INSERT OR REPLACE INTO track_info (video_id, expires, data) VALUES (?, ?, ?)',
+            (video_id, expires, json.dumps(data))
+        )
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry from both tiers."""
+        self._memory.delete(key)
+        self._submit('DELETE FROM track_info WHERE video_id = ?', (key,))
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers."""
+        self._memory.clear()
+        self._submit('DELETE FROM track_info')
+
+    def close(self) -> None:
+        """Finish pending writes and close the persistent store."""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    def _read(self, video_id: str) -> Optional[tuple]:
+        """Fetch a row from SQLite; runs on the cache's database thread."""
+        try:
+            return self._db.execute(
+                'SELECT expires, data FROM track_info WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Metadata cache read failed: {e}")
+            return None
+
+    def _submit(self, sql: str, params: tuple = ()) -> None:
+        """Queue a write on the cache's database thread without waiting for it."""
+        if self._executor:
+            self._executor.submit(self._write, sql, params)
+
+    def _write(self, sql: str, params: tuple) -> None:
+        """Run and commit one write; runs on the cache's database thread."""
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Metadata cache write failed: {e}")
@@ -3,9 +3,29 @@ from typing import List, Dict, Optional
 import re
 from difflib import SequenceMatcher
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import TRACK_INFO_CACHE_SIZE, TRACK_INFO_CACHE_TTL
+from utils.metadata_cache import TTLCache
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # rapidfuzz is optional; fall back to difflib
+    fuzz = None
 
 logger = logging.getLogger('music_bot')
 
+# Common YouTube music title tags, e.g. "(Official Video)" or "[Lyrics]"
+TITLE_TAG_PATTERN = re.compile(r'\((?:Official|Lyrics|Audio|Video).*?\)|\[(?:Official|Lyrics|Audio|Video).*?\]')
+# Any other parenthesized or bracketed part, with the whitespace before it
+PARENTHESIZED_PATTERN = re.compile(r"\s*\(.*?\)")
+BRACKETED_PATTERN = re.compile(r"\s*\[.*?\]")
+
+def title_similarity(a: str, b: str) -> float:
+    """Similarity of two strings from 0 to 1, using rapidfuzz when it is installed."""
+    if fuzz is not None:
+        return fuzz.ratio(a, b) / 100.0
+    return SequenceMatcher(None, a, b).ratio()
+
 class MusicRecommender:
     def __init__(self, api_key: str, api_secret: str, username: str = None, password_hash: str = None):
         """
@@ -23,6 +43,10 @@ class MusicRecommender:
             username=username,
             password_hash=password_hash
         )
+        # Fans out the per-track stat requests in get_track_info
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='lastfm')
+        # Last.fm track stats change slowly, so keep them for a day
+        self._track_info_cache = TTLCache(max_size=TRACK_INFO_CACHE_SIZE, ttl=TRACK_INFO_CACHE_TTL)
         
     def clean_title(self, title: str) -> tuple[str, str]:
         """
@@ -35,18 +59,9 @@ class MusicRecommender:
             Tuple of (artist, track_name)
         """
         # Remove common YouTube music title patterns
-        title = re.sub(r'\(Official.*?\)', '', title)
-        title = re.sub(r'\[Official.*?\]', '', title)
-        title = re.sub(r'\(Lyrics.*?\)', '', title)
-        title = re.sub(r'\[Lyrics.*?\]', '', title)
-        title = re.sub(r'\(Audio.*?\)', '', title)
-        title = re.sub(r'\[Audio.*?\]', '', title)
-        title = re.sub(r'\(Official Music Video\)', '', title)
-        title = re.sub(r'\(Official Video\)', '', title)
-        title = re.sub(r'\(Video.*?\)', '', title)
-        title = re.sub(r'\[Video.*?\]', '', title)
-        title = re.sub(r"\s*\(.*?\)", "", title)
-        title = re.sub(r"\s*\[.*?\]", "", title)
+        title = TITLE_TAG_PATTERN.sub('', title)
+        title = PARENTHESIZED_PATTERN.sub('', title)
+        title = BRACKETED_PATTERN.sub('', title)
         
         # Try to split by common separators
         for separator in [' - ', ' – ', ' — ']:
@@ -74,43 +89,31 @@ class MusicRecommender:
         """
         logger.info(f"Starting get_similar_tracks")
         try:
-            # Clean the YouTube title
-            track_info = self.get_track_info(youtube_title)
+            # Resolve the track once; its stats aren't needed for recommendations
+            track = self._find_track(youtube_title)
+            if track is None:
+                return []
+            track_info = {'artist': track.artist.name, 'title': track.title}
             logger.info(f"Finding similar to artist: {track_info['artist']} and with title: {track_info['title']}")
             
-            # If we couldn't extract artist, try to find the track directly
-            if len(track_info['artist'])==0:
-                search_results = self.network.search_for_track("", track_info['title'])
-                search_results = search_results.get_next_page()
-                
-                if search_results:
-                    # Use the first search result
-                    track = search_results[0]
-                else:
-                    return []
-            else:
-                # If we have artist and track, get the track directly
-                track = self.network.get_track(track_info['artist'], track_info['title'])
-            
             # Get similar tracks
             similar_tracks = track.get_similar(limit=limit)
             
+            query = f"{track_info['artist']} {track_info['title']}".lower()
             recommendations = []
             for similar in similar_tracks:
+                artist_name = similar.item.artist.name
+                title = similar.item.title
                 # Calculate similarity score between original and recommendation
-                similarity = SequenceMatcher(
-                    None,
-                    f"{track_info['artist']} {track_info['title']}".lower(),
-                    f"{similar.item.artist.name} {similar.item.title}".lower()
-                ).ratio()
+                similarity = title_similarity(query, f"{artist_name} {title}".lower())
                 
                 # Only include recommendations with sufficient similarity
                 if similarity >= min_similarity:
                     recommendations.append({
-                        'artist': similar.item.artist.name,
-                        'title': similar.item.title,
+                        'artist': artist_name,
+                        'title': title,
                         'similarity_score': similarity,
-                        'search_query': f"{similar.item.artist.name} - {similar.item.title}"
+                        'search_query': f"{artist_name} - {title}"
                     })
             
             return sorted(recommendations, key=lambda x: x['similarity_score'], reverse=True)
@@ -122,6 +125,17 @@ class MusicRecommender:
             print(f"Error getting recommendations: {e}")
             return []
 
+    def _find_track(self, youtube_title: str) -> Optional[pylast.Track]:
+        """Look up the Last.fm track for a YouTube title, or None if nothing matches."""
+        artist, track_name = self.clean_title(youtube_title)
+        
+        # If we couldn't extract artist, search for the track by name
+        if len(artist)==0:
+            search_results = self.network.search_for_track("", track_name)
+            search_results = search_results.get_next_page()
+            return search_results[0] if search_results else None
+        return self.network.get_track(artist, track_name)
+
     def get_track_info(self, youtube_title: str) -> Optional[Dict]:
         """
         Get additional track information from Last.fm.
@@ -133,27 +147,36 @@ class MusicRecommender:
             Dictionary containing track information or None if not found
         """
         try:
-            artist, track_name = self.clean_title(youtube_title)
-            
-            if len(artist)==0:
-                search_results = self.network.search_for_track("", track_name)
-                search_results = search_results.get_next_page()
-                if search_results:
-                    track = search_results[0]
-                else:
-                    return None
-            else:
-                track = self.network.get_track(artist, track_name)
-            
-            return {
+            track = self._find_track(youtube_title)
+            if track is None:
+                return None
+
+            cache_key = (track.artist.name.lower(), track.title.lower())
+            cached = self._track_info_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+            # The stats are independent Last.fm requests, so fetch them concurrently
+            listeners = self._executor.submit(track.get_listener_count)
+            playcount = self._executor.submit(track.get_playcount)
+            top_tags = self._executor.submit(track.get_top_tags, limit=5)
+            wiki = self._executor.submit(track.get_wiki_content)
+
+            info = {
                 'artist': track.artist.name,
                 'title': track.title,
-                'listeners': track.get_listener_count(),
-                'playcount': track.get_playcount(),
-                'tags': [tag.item.name for tag in track.get_top_tags(limit=5)],
-                'wiki': track.get_wiki_content() if track.get_wiki_content() else None
+                'listeners': listeners.result(),
+                'playcount': playcount.result(),
+                'tags': [tag.item.name for tag in top_tags.result()],
+                'wiki': wiki.result() or None
             }
+            self._track_info_cache.set(cache_key, info)
+            return dict(info)
             
         except Exception as e:
             print(f"Error getting track info: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def close(self) -> None:
+        """Shut down the stat request threads; called when the music cog unloads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
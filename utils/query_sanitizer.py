@@ -3,23 +3,48 @@ from urllib.parse import urlparse
 import html
 import logging
 
+try:
+    import re2
+except ImportError:  # google-re2 is optional; fall back to the re module
+    re2 = None
+
 logger = logging.getLogger('music_bot')
 
 class QuerySanitizer:
+    # Substrings that mark a query as a URL to validate
+    _URL_MARKERS = ('http:', 'https:', 'www.')
+    # Possible starts of a URL matched by the YouTube pattern
+    _YOUTUBE_URL_PREFIXES = (
+        'http://', 'https://', 'www.youtube.com/', 'www.youtu.be/', 'youtube.com/', 'youtu.be/'
+    )
+
     def __init__(self):
         # Common patterns that might indicate malicious input
         self.suspicious_patterns = [
-            r'(?i);.*?(?:DROP|DELETE|UPDATE|INSERT|SELECT)\s+.*',  # SQL injection attempts
-            r'(?i)<script[\s\S]*?>[\s\S]*?</script>',  # XSS attempts
-            r'(?i)javascript:',  # JavaScript injection
-            r'(?i)\b(select|insert|update|delete|drop|truncate|alter|exec)\b.*?(?:from|into|table)',  # SQL keywords
-            r'(?i)system\([^)]*\)',  # System command execution attempts
-            r'(?i)(?:\/\.\.\/|\.\.\/|\.\.\%2f|\.\.%5c)',  # Directory traversal attempts
-            r'(?i)(<|>|&lt;|&gt;|&#x3C;|&#x3E;)',  # HTML tags
-            r'(?i)\b(union\s+select|union\s+all\s+select)\b',  # SQL UNION attacks
-            r'(?i)\b(and|or)\b.+?\b(true|false)\b',  # SQL logical operations
-            r'(?i)(\%27|\'|\-\-|\#|\%23)\s*$'  # SQL comment attacks
+            r';.*?(?:DROP|DELETE|UPDATE|INSERT|SELECT)\s+.*',  # SQL injection attempts
+            r'<script[\s\S]*?>[\s\S]*?</script>',  # XSS attempts
+            r'javascript:',  # JavaScript injection
+            r'\b(select|insert|update|delete|drop|truncate|alter|exec)\b.*?(?:from|into|table)',  # SQL keywords
+            r'system\([^)]*\)',  # System command execution attempts
+            r'(?:\/\.\.\/|\.\.\/|\.\.\%2f|\.\.%5c)',  # Directory traversal attempts
+            r'(<|>|&lt;|&gt;|&#x3C;|&#x3E;)',  # HTML tags
+            r'\b(union\s+select|union\s+all\s+select)\b',  # SQL UNION attacks
+            r'\b(and|or)\b.+?\b(true|false)\b',  # SQL logical operations
+            r'(\%27|\'|\-\-|\#|\%23)\s*$'  # SQL comment attacks
         ]
+        # All patterns in one case-insensitive alternation, so a query is scanned once
+        self._suspicious_re = self._compile_suspicious(
+            "(?i)" + "|".join(f"(?:{pattern})" for pattern in self.suspicious_patterns)
+        )
+
+        # Accepted YouTube URL shapes, matched against the whole query; the optional tail
+        # allows plain query parameters such as &list=..., ?si=... or &t=30 (with & possibly
+        # already escaped to &amp; by sanitize_query)
+        self._youtube_re = re.compile(
+            r'(?:https?://)?(?:www\.)?'
+            r'(?:youtube\.com/watch\?v=[\w-]+|youtu\.be/[\w-]+|youtube\.com/playlist\?list=[\w-]+)'
+            r'(?:[?&#][\w=%.&;-]*)?'
+        )
         
         # Allowed URL schemes for music
         self.allowed_schemes = ['http', 'https', 'youtube', 'youtu.be']
@@ -27,6 +52,17 @@ class QuerySanitizer:
         # Maximum query length
         self.MAX_QUERY_LENGTH = 200
 
+    @staticmethod
+    def _compile_suspicious(pattern: str):
+        """Compile the combined pattern with RE2 when available, else with re."""
+        if re2 is not None:
+            try:
+                # RE2 matches in a single linear pass, without backtracking
+                return re2.compile(pattern)
+            except Exception as e:
+                logger.warning(f"RE2 could not compile the suspicious patterns, using re: {e}")
+        return re.compile(pattern)
+
     def sanitize_query(self, query: str, user_id: str = "Unknown") -> tuple[bool, str, str]:
         """
         Sanitizes the input query and checks for potential security issues.
@@ -56,14 +92,17 @@ class QuerySanitizer:
         logger.debug(f"Basic sanitization complete. Original: '{query}' -> Sanitized: '{sanitized}'")
         
         # Check for suspicious patterns
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, sanitized):
-                logger.warning(f"Suspicious pattern detected in query from user {user_id}. Pattern: {pattern}")
-                logger.warning(f"Original query: {query}")
-                return False, "", "Potentially malicious pattern detected"
+        match = self._suspicious_re.search(sanitized)
+        if match:
+            logger.warning(f"Suspicious pattern detected in query from user {user_id}. Match: {match.group(0)!r}")
+            logger.warning(f"Original query: {query}")
+            return False, "", "Potentially malicious pattern detected"
+
+        # Lowercased once for the URL and YouTube checks below
+        lowered = sanitized.lower()
 
         # If it's a URL, validate it
-        if any(scheme in sanitized.lower() for scheme in ['http:', 'https:', 'www.']):
+        if any(scheme in lowered for scheme in self._URL_MARKERS):
             try:
                 parsed_url = urlparse(sanitized)
                 logger.debug(f"URL validation - Scheme: {parsed_url.scheme}, NetLoc: {parsed_url.netloc}")
@@ -76,7 +115,7 @@ class QuerySanitizer:
                 return False, "", f"Invalid URL format: {str(e)}"
 
         # Additional YouTube-specific validation
-        if 'youtube.com' in sanitized.lower() or 'youtu.be' in sanitized.lower():
+        if 'youtube.com' in lowered or 'youtu.be' in lowered:
             if not self.is_valid_youtube_url(sanitized):
                 logger.warning(f"Invalid YouTube URL format from user {user_id}: {sanitized}")
                 return False, "", "Invalid YouTube URL format"
@@ -96,13 +135,9 @@ class QuerySanitizer:
         Returns:
             bool: True if valid YouTube URL, False otherwise
         """
-        youtube_patterns = [
-            r'^(https?://)?(www\.)?(youtube\.com/watch\?v=[\w-]+)',
-            r'^(https?://)?(www\.)?(youtu\.be/[\w-]+)',
-            r'^(https?://)?(www\.)?(youtube\.com/playlist\?list=[\w-]+)'
-        ]
-        
-        is_valid = any(re.match(pattern, url) for pattern in youtube_patterns)
+        # Every accepted shape starts with one of these, so most inputs skip the regex
+        is_valid = (url.startswith(self._YOUTUBE_URL_PREFIXES)
+                    and self._youtube_re.fullmatch(url) is not None)
         logger.debug(f"YouTube URL validation: {url} -> {'Valid' if is_valid else 'Invalid'}")
         return is_valid
     
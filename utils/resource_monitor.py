@@ -1,6 +1,5 @@
 import psutil
-import threading
-import time
+import asyncio
 import logging
 
 logger = logging.getLogger('music_bot')
@@ -9,25 +8,32 @@ class ResourceMonitor:
     def __init__(self, warning_cpu_percent=70, warning_memory_percent=70):
         self.warning_cpu_percent = warning_cpu_percent
         self.warning_memory_percent = warning_memory_percent
-        self._stop_event = threading.Event()
-        self._monitor_thread = None
+        self._task = None
+        # Reused across samples: cpu_percent() measures since the previous call on the same
+        # object, so a fresh Process each time would always report 0%
+        self._process = psutil.Process()
 
     def start(self):
-        """Start monitoring resources."""
-        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._monitor_thread.start()
+        """Start monitoring resources on the running event loop."""
+        # Prime the non-blocking baselines for the first sample
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent()
+        self._task = asyncio.create_task(self._monitor_loop())
 
     def stop(self):
         """Stop monitoring resources."""
-        self._stop_event.set()
-        if self._monitor_thread:
-            self._monitor_thread.join()
+        if self._task:
+            self._task.cancel()
+            self._task = None
 
-    def _monitor_loop(self):
+    async def _monitor_loop(self):
         """Monitor system resources."""
-        while not self._stop_event.is_set():
+        while True:
+            await asyncio.sleep(5)  # Check every 5 seconds
+
             try:
-                cpu_percent = psutil.cpu_percent(interval=1)
+                # Non-blocking: usage since the previous sample
+                cpu_percent = psutil.cpu_percent(interval=None)
                 memory_percent = psutil.virtual_memory().percent
 
                 if cpu_percent > self.warning_cpu_percent:
@@ -37,10 +43,9 @@ class ResourceMonitor:
                     logger.warning(f"High memory usage detected: {memory_percent}%")
 
                 # Check for specific process resources
-                process = psutil.Process()
-                with process.oneshot():
-                    cpu_percent = process.cpu_percent()
-                    memory_info = process.memory_info()
+                with self._process.oneshot():
+                    cpu_percent = self._process.cpu_percent()
+                    memory_info = self._process.memory_info()
                     
                     if cpu_percent > self.warning_cpu_percent:
                         logger.warning(f"Process CPU usage high: {cpu_percent}%")
@@ -50,5 +55,3 @@ class ResourceMonitor:
 
             except Exception as e:
                 logger.error(f"Error in resource monitor: {e}")
-
-            time.sleep(5)  # Check every 5 seconds
\ No newline at end of file
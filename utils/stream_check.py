@@ -0,0 +1,59 @@
+import asyncio
+import aiohttp
+import logging
+from typing import Optional
+
+logger = logging.getLogger('music_bot')
+
+
+async def verify_stream(url: str, session: Optional[aiohttp.ClientSession] = None) -> None:
+    """
+    Check that a stream URL plays before FFmpeg is pointed at it.
+
+    A HEAD request through the session, if given, settles most checks without
+    starting ffmpeg; otherwise the first second of the stream is decoded.
+
+    Raises:
+        Exception: If the stream can't be decoded within 5 seconds
+    """
+    if not (session and await head_stream(url, session)):
+        await probe_stream(url)
+
+
+async def head_stream(url: str, session: aiohttp.ClientSession) -> bool:
+    """Cheap check that a stream URL serves audio, without starting ffmpeg."""
+    try:
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with session.head(url, allow_redirects=True, timeout=timeout) as response:
+            content_type = response.headers.get('Content-Type', '')
+            return response.status == 200 and content_type.startswith(('audio/', 'video/'))
+    except Exception as e:
+        logger.debug("HEAD check of audio stream failed: %s", e)
+        return False
+
+
+async def probe_stream(url: str) -> None:
+    """Decode the first second of a stream with ffmpeg; raises if it can't within 5s."""
+    logger.info("Testing audio stream...")
+    # An asyncio subprocess, so waiting on ffmpeg doesn't hold an executor thread
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg',
+        '-v', 'error',
+        '-i', url,
+        '-t', '1',  # Test first second only
+        '-f', 'null',
+        '-',
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=5)
+    except BaseException:
+        # Timed out or cancelled: don't leave ffmpeg running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if stderr and logger.isEnabledFor(logging.WARNING):
+        logger.warning("Stream test warning: %s", stderr.decode(errors='replace'))
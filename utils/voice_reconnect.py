@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+logger = logging.getLogger('music_bot')
+
+
+async def try_resume(voice_client, channel, timeout=10.0):
+    """
+    Re-run the voice handshake on an existing, dropped voice client.
+
+    Reusing the client keeps its session and avoids tearing down the guild's
+    voice state; if that fails the client is dropped and a fresh connection
+    is made to the channel.
+
+    Returns:
+        bool: True if the bot is connected to the channel afterwards
+    """
+    try:
+        await voice_client.connect(reconnect=True, timeout=timeout)
+        if voice_client.is_connected():
+            logger.info("Resumed voice connection")
+            return True
+    except Exception as e:
+        logger.warning("Voice resume failed, reconnecting from scratch: %s", e)
+
+    await voice_client.disconnect(force=True)
+    await channel.connect(timeout=timeout)
+    return True
+
+
+async def auto_reconnect(voice_client, channel, attempts=5):
+    """Attempt to reconnect to voice channel if disconnected."""
+    for i in range(attempts):
+        try:
+            if voice_client is None:
+                await channel.connect()
+                logger.info("Successfully reconnected to voice channel")
+                return True
+            if not voice_client.is_connected():
+                await try_resume(voice_client, channel)
+                logger.info("Successfully reconnected to voice channel")
+                return True
+            return True
+        except Exception as e:
+            logger.error("Reconnection attempt %d failed: %s", i + 1, e)
+            await asyncio.sleep(1)
+    return False
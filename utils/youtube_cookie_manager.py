@@ -1,146 +1,140 @@
 import os
 import uuid
+import weakref
 import time
-import random
-import string
+import secrets
 import tempfile
-from http.cookiejar import MozillaCookieJar, Cookie
+from types import MappingProxyType
+
+_COOKIE_DOMAIN = '.youtube.com'
+_COOKIE_FILE_HEADER = '# Netscape HTTP Cookie File\n\n'
+
+# Cookies whose values don't change between refreshes, as (name, value)
+_COOKIE_ROWS = (
+    ('PREF', 'hl=en&gl=US'),
+    ('_gcl_au', '1.1.548239985.1674856835'),
+    ('VISITOR_PRIVACY_METADATA', 'CgJVUxICGgA='),
+)
+
+# Parts of the yt-dlp options that never change, built once instead of per call. They
+# are shared by every options dict, so they are read-only all the way down: mappings
+# are proxies and lists are tuples, and no YoutubeDL can change them for the others
+_YT_DLP_EXTRACTOR_ARGS = MappingProxyType({
+    'youtube': MappingProxyType({
+        'player_client': ('ios',),
+        'player_skip': ('webpage', 'config', 'js'),
+        'innertube_client': ('ios',),
+        'skip': ('dash', 'hls'),
+    })
+})
+
+_YT_DLP_HTTP_HEADERS = MappingProxyType({
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Mobile/15E148 Safari/604.1',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-us',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'X-YouTube-Client-Name': '2',
+    'X-YouTube-Client-Version': '17.42.7',
+    'Origin': 'https://m.youtube.com',
+    'Referer': 'https://m.youtube.com/'
+})
+
+_YT_DLP_STATIC_OPTIONS = MappingProxyType({
+    'quiet': False,
+    'no_warnings': False,
+    'extract_flat': True,
+    'format': 'bestaudio/best',
+    'extractor_args': _YT_DLP_EXTRACTOR_ARGS,
+    'http_headers': _YT_DLP_HTTP_HEADERS,
+    'ap_muted': True,
+    'prefer_insecure': False,
+    'geo_bypass': True,
+    'geo_bypass_country': 'US',
+    'socket_timeout': 30
+})
+
+def _remove_cookie_file(path: str) -> None:
+    """Delete a cookie file if it is still there."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error cleaning up cookie file: {e}")
 
 class YoutubeCookieManager:
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
         self.cookie_file = None
-        self.cookie_jar = None
-        self.last_creation_time = 0
+        self._valid_until = 0.0  # time.monotonic() at which the cookie file is refreshed
         self.cookie_lifetime = 3600  # 1 hour in seconds
         self.device_id = str(uuid.uuid4())
+        # One path per manager, refreshed in place: yt-dlp options built earlier keep
+        # pointing at it, so the file must not be moved or removed while in use
+        self._path = os.path.join(self.temp_dir, f'youtube_cookies_{self.device_id}.txt')
+        # Remove the file when the manager is collected or, at the latest, at exit; unlike
+        # __del__ this holds no reference to the manager and runs while os is still usable
+        self._finalizer = weakref.finalize(self, _remove_cookie_file, self._path)
 
     def _generate_visitor_id(self) -> str:
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=11))
+        # 8 random bytes are 11 URL-safe base64 characters, the length of a real visitor ID
+        return secrets.token_urlsafe(8)
 
-    def _create_cookie_jar(self) -> MozillaCookieJar:
+    def _write_cookie_file(self) -> None:
+        """Write the cookies in the Netscape cookies.txt format yt-dlp reads."""
         current_time = int(time.time())
         future_time = current_time + 365 * 24 * 60 * 60
-        visitor_id = self._generate_visitor_id()
-        
-        cookies = [
-            {
-                'name': 'CONSENT',
-                'value': f'YES+cb.20220301-11-p0.en-GB+FX+{current_time}',
-                'domain': '.youtube.com'
-            },
-            {
-                'name': 'VISITOR_INFO1_LIVE',
-                'value': visitor_id,
-                'domain': '.youtube.com'
-            },
-            {
-                'name': 'PREF',
-                'value': 'hl=en&gl=US',
-                'domain': '.youtube.com'
-            },
-            {
-                'name': '_gcl_au',
-                'value': '1.1.548239985.1674856835',
-                'domain': '.youtube.com'
-            },
-            {
-                'name': 'DEVICE_INFO',
-                'value': self.device_id,
-                'domain': '.youtube.com'
-            },
-            {
-                'name': 'VISITOR_PRIVACY_METADATA',
-                'value': 'CgJVUxICGgA=',
-                'domain': '.youtube.com'
-            }
-        ]
-        
-        cookie_jar = MozillaCookieJar(self.cookie_file)
-        
-        for cookie_data in cookies:
-            cookie = Cookie(
-                version=0,
-                name=cookie_data['name'],
-                value=cookie_data['value'],
-                port=None,
-                port_specified=False,
-                domain=cookie_data['domain'],
-                domain_specified=True,
-                domain_initial_dot=True,
-                path='/',
-                path_specified=True,
-                secure=True,
-                expires=future_time,
-                discard=False,
-                comment=None,
-                comment_url=None,
-                rest={},
-                rfc2109=False
-            )
-            cookie_jar._cookies.setdefault(cookie_data['domain'], {}).setdefault('/', {})[cookie_data['name']] = cookie
-        
-        return cookie_jar
+        rows = (
+            ('CONSENT', f'YES+cb.20220301-11-p0.en-GB+FX+{current_time}'),
+            ('VISITOR_INFO1_LIVE', self._generate_visitor_id()),
+            *_COOKIE_ROWS,
+            ('DEVICE_INFO', self.device_id),
+        )
+
+        # Write a temporary file beside the real one and rename it into place, so yt-dlp
+        # reading the cookies mid-refresh sees either the old file or the new one
+        with tempfile.NamedTemporaryFile(
+            'w', dir=self.temp_dir, prefix='youtube_cookies_', suffix='.tmp', delete=False
+        ) as f:
+            f.write(_COOKIE_FILE_HEADER + ''.join(
+                f'{_COOKIE_DOMAIN}\tTRUE\t/\tTRUE\t{future_time}\t{name}\t{value}\n'
+                for name, value in rows
+            ))
+        try:
+            os.replace(f.name, self.cookie_file)
+        except BaseException:
+            _remove_cookie_file(f.name)
+            raise
 
     def get_cookie_file(self) -> str:
-        current_time = time.time()
-        
-        if (self.cookie_file is None or 
-            not os.path.exists(self.cookie_file) or 
-            current_time - self.last_creation_time > self.cookie_lifetime):
-            
-            self.cleanup()
-            self.cookie_file = os.path.join(
-                self.temp_dir, 
-                f'youtube_cookies_{int(current_time)}.txt'
-            )
-            self.cookie_jar = self._create_cookie_jar()
-            self.cookie_jar.save()
-            self.last_creation_time = current_time
-            
+        # Only this manager removes the file, so within its lifetime it is still there
+        if self.cookie_file is not None and time.monotonic() < self._valid_until:
+            return self.cookie_file
+
+        self.cookie_file = self._path
+        self._write_cookie_file()
+        self._valid_until = time.monotonic() + self.cookie_lifetime
         return self.cookie_file
 
+    def get_yt_dlp_options(self) -> dict:
+        """
+        yt-dlp options that use this manager's cookies.
+
+        The cookie file is only rewritten once per cookie lifetime and the fixed
+        options are shared module constants, so a call only merges the two into a
+        new top-level dict; it stays per call because YoutubeDL adds keys to it.
+        """
+        return {'cookiefile': self.get_cookie_file(), **_YT_DLP_STATIC_OPTIONS}
+
     def cleanup(self) -> None:
-        if self.cookie_file and os.path.exists(self.cookie_file):
-            try:
-                os.remove(self.cookie_file)
-                self.cookie_file = None
-                self.cookie_jar = None
-            except Exception as e:
-                print(f"Error cleaning up cookie file: {e}")
+        """Delete the cookie file; the next get_cookie_file call writes it again."""
+        if self.cookie_file:
+            _remove_cookie_file(self.cookie_file)
+            self.cookie_file = None
+            self._valid_until = 0.0
 
-    def get_yt_dlp_options(self) -> dict:
-        return {
-            'quiet': False,
-            'no_warnings': False,
-            'cookiefile': self.get_cookie_file(),
-            'extract_flat': True,
-            'format': 'bestaudio/best',
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['ios'],
-                    'player_skip': ['webpage', 'config', 'js'],
-                    'innertube_client': ['ios'],
-                    'skip': ['dash', 'hls'],
-                }
-            },
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Mobile/15E148 Safari/604.1',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-us',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'X-YouTube-Client-Name': '2',
-                'X-YouTube-Client-Version': '17.42.7',
-                'Origin': 'https://m.youtube.com',
-                'Referer': 'https://m.youtube.com/'
-            },
-            'ap_muted': True,
-            'prefer_insecure': False,
-            'geo_bypass': True,
-            'geo_bypass_country': 'US',
-            'socket_timeout': 30
-        }
-
-    def __del__(self):
-        self.cleanup()
\ No newline at end of file
+    def close(self) -> None:
+        """Delete the cookie file for good, once the manager is no longer needed."""
+        self.cleanup()
+        self._finalizer.detach()
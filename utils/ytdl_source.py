@@ -2,17 +2,37 @@ import os
 import stat
 import asyncio
 import discord
+import threading
 from yt_dlp import YoutubeDL
-from config.settings import YTDL_FORMAT_OPTIONS, FFMPEG_OPTIONS, FFMPEG_PATH
+from config.settings import (
+    YTDL_FORMAT_OPTIONS, FFMPEG_OPTIONS, FFMPEG_PATH, STREAM_CACHE_SIZE, STREAM_CACHE_TTL,
+    STREAM_VERIFY_AGE
+)
+from utils.stream_check import verify_stream
+from utils.metadata_cache import TTLCache, extract_video_id, youtube_ie_key
 from services.music_queue import Track
 import logging
 import time
 from typing import Optional, Dict
-import subprocess
 
 
 logger = logging.getLogger('music_bot')
 
+# One YoutubeDL per executor thread: building one loads every extractor, and
+# concurrent extractions shouldn't share an instance's state
+_tls = threading.local()
+
+def _get_ytdl() -> YoutubeDL:
+    """Get the calling thread's YoutubeDL instance, creating it on first use."""
+    ytdl = getattr(_tls, 'ytdl', None)
+    if ytdl is None:
+        ytdl = YoutubeDL(YTDL_FORMAT_OPTIONS)
+        _tls.ytdl = ytdl
+    return ytdl
+
+# Resolved (data, stream_url, codec_known, resolved_at) per video, so replays skip the yt-dlp round-trip
+_stream_cache = TTLCache(max_size=STREAM_CACHE_SIZE, ttl=STREAM_CACHE_TTL)
+
 class YTDLSource(discord.PCMVolumeTransformer):
     def __init__(self, source, *, data, volume=0.5):
         super().__init__(source, volume)
@@ -26,90 +46,110 @@ class YTDLSource(discord.PCMVolumeTransformer):
         self._volume = volume
 
     @classmethod
-    async def from_url(cls, url, *, loop=None, stream=True):
-        """Create a YTDLSource from a URL."""
+    async def from_url(cls, url, *, loop=None, stream=True, executor=None, session=None):
+        """
+        Create a YTDLSource from a URL, running blocking work on the given executor.
+
+        An aiohttp session, if given, is used to check streams that need verifying.
+        """
         loop = loop or asyncio.get_event_loop()
         
         try:
-            # Extract info
-            with YoutubeDL(YTDL_FORMAT_OPTIONS) as ytdl:
-                logger.info(f"Extracting info for URL: {url}")
-                data = await loop.run_in_executor(
-                    None,
-                    lambda: ytdl.extract_info(url, download=not stream)
+            # Only streamed lookups are cached; a download has to run every time
+            cache_key = (extract_video_id(url) or url) if stream else None
+            for _ in range(2):
+                cached = _stream_cache.get(cache_key) if cache_key else None
+                if cached:
+                    data, stream_url, codec_known, resolved_at = cached
+                    logger.info("Using cached audio stream for URL: %s", url)
+                else:
+                    data, stream_url, codec_known = await loop.run_in_executor(
+                        executor,
+                        lambda: cls._resolve_stream(url, stream)
+                    )
+                    resolved_at = time.time()
+                    if cache_key:
+                        _stream_cache.set(cache_key, (data, stream_url, codec_known, resolved_at))
+
+                # Check the stream before FFmpeg is pointed at it when yt-dlp didn't report
+                # an audio codec, or when the URL has been cached long enough to be revoked
+                stale = time.time() - resolved_at > STREAM_VERIFY_AGE
+                source = await cls._create_audio_source(
+                    stream_url, session=session, verify=stale or not codec_known
                 )
-
-            if not data:
-                raise ValueError("Could not extract video information")
-
-            if 'entries' in data:
-                data = data['entries'][0]
-
-            # Get best audio format
-            formats = data.get('formats', [])
-            best_audio = None
-            
-            # First try to find Opus format
-            for f in formats:
-                if (f.get('acodec') == 'opus' and 
-                    (not f.get('vcodec') or f.get('vcodec') == 'none')):
-                    best_audio = f
+                if source:
+                    break
+                # Forget the URL; a stale one gets a single fresh resolve right away
+                if cache_key:
+                    _stream_cache.delete(cache_key)
+                if not stale:
                     break
 
-            # If no Opus, try any audio format
-            if not best_audio:
-                for f in formats:
-                    if (f.get('acodec') and f.get('acodec') != 'none' and 
-                        (not f.get('vcodec') or f.get('vcodec') == 'none')):
-                        best_audio = f
-                        break
-
-            # If still no format found, use the default URL
-            if best_audio:
-                stream_url = best_audio['url']
-                logger.info(f"Using audio format: {best_audio.get('format_id')} "
-                          f"(codec: {best_audio.get('acodec')})")
-            else:
-                stream_url = data['url']
-                logger.info("Using default stream URL")
-
-            # Create FFmpeg audio source
-            source = await cls._create_audio_source(stream_url, loop)
             if not source:
                 raise ValueError("Could not create audio source")
 
-            instance = cls(source, data=data)
+            instance = cls(source, data=dict(data))
             instance.stream_url = stream_url
             return instance
 
         except Exception as e:
-            logger.error(f"Error creating source: {e}")
+            logger.error("Error creating source: %s", e)
             raise
 
+    @staticmethod
+    def _resolve_stream(url: str, stream: bool = True) -> tuple[Dict, str, bool]:
+        """Extract the track fields playback needs, the best audio stream URL, and whether its codec is known."""
+        # Extract info
+        logger.info("Extracting info for URL: %s", url)
+        # A plain video URL goes straight to the YouTube extractor, skipping the
+        # URL match against every registered extractor
+        data = _get_ytdl().extract_info(
+            url, download=not stream, ie_key=youtube_ie_key(url)
+        )
+
+        if not data:
+            raise ValueError("Could not extract video information")
+
+        if 'entries' in data:
+            data = data['entries'][0]
+
+        # Take the first audio-only Opus format; until one turns up, track the
+        # highest-bitrate audio-only format so no second pass is needed
+        best_audio = None
+        for f in data.get('formats', []):
+            acodec = f.get('acodec')
+            if not acodec or acodec == 'none' or f.get('vcodec') not in (None, '', 'none'):
+                continue
+            if acodec == 'opus':
+                best_audio = f
+                break
+            if best_audio is None or (f.get('abr') or 0) > (best_audio.get('abr') or 0):
+                best_audio = f
+
+        # If still no format found, use the default URL
+        if best_audio:
+            logger.info("Using audio format: %s (codec: %s)",
+                        best_audio.get('format_id'), best_audio.get('acodec'))
+            stream_url, codec_known = best_audio['url'], True
+        else:
+            logger.info("Using default stream URL")
+            stream_url, codec_known = data['url'], False
+
+        # Keep only what playback reads; the full info dict carries every format
+        # and would be held by the stream cache for its whole TTL
+        track_data = {
+            key: data[key] for key in ('title', 'webpage_url', 'duration', 'thumbnail')
+            if key in data
+        }
+        track_data['url'] = stream_url
+        return track_data, stream_url, codec_known
+
     @classmethod
-    async def _create_audio_source(cls, url: str, loop) -> Optional[discord.FFmpegPCMAudio]:
-        """Create an audio source with verification."""
+    async def _create_audio_source(cls, url: str, *, verify: bool = True, session=None) -> Optional[discord.FFmpegPCMAudio]:
+        """Create an audio source, first test-decoding the stream if verify is set."""
         try:
-            # Test the audio stream
-            logger.info("Testing audio stream...")
-            test_command = [
-                'ffmpeg',
-                '-v', 'error',
-                '-i', url,
-                '-t', '1',  # Test first second only
-                '-f', 'null',
-                '-'
-            ]
-            
-            process = await loop.run_in_executor(
-                None,
-                lambda: subprocess.run(test_command, 
-                                     stderr=subprocess.PIPE,
-                                     timeout=5)
-            )
-
-            if process.stderr:
-                logger.warning(f"Stream test warning: {process.stderr.decode()}")
+            if verify:
+                await verify_stream(url, session)
 
             logger.info("Creating FFmpeg audio source...")
             return discord.FFmpegPCMAudio(
@@ -118,13 +158,13 @@ class YTDLSource(discord.PCMVolumeTransformer):
             )
 
         except Exception as e:
-            logger.error(f"Error creating audio source: {e}")
+            logger.error("Error creating audio source: %s", e)
             return None
 
     @classmethod
-    async def from_track(cls, track, *, loop=None):
+    async def from_track(cls, track, *, loop=None, executor=None, session=None):
         """Create a YTDLSource from a Track object."""
-        return await cls.from_url(track.url, loop=loop, stream=True)
+        return await cls.from_url(track.url, loop=loop, stream=True, executor=executor, session=session)
 
     def cleanup(self):
         """Clean up resources."""
@@ -140,19 +180,4 @@ class YTDLSource(discord.PCMVolumeTransformer):
                     except:
                         pass
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
-            
-# Auto-reconnect feature for the music cog
-async def auto_reconnect(voice_client, channel, attempts=5):
-    """Attempt to reconnect to voice channel if disconnected."""
-    for i in range(attempts):
-        try:
-            if not voice_client.is_connected():
-                await channel.connect()
-                logger.info("Successfully reconnected to voice channel")
-                return True
-            return True
-        except Exception as e:
-            logger.error(f"Reconnection attempt {i+1} failed: {e}")
-            await asyncio.sleep(1)
-    return False
\ No newline at end of file
+            logger.error("Error during cleanup: %s", e)
@@ -6,14 +6,33 @@ from pytubefix import YouTube
 import logging
 import time
 from typing import Optional, Dict
-import subprocess
 from urllib.parse import urlparse, parse_qs
+from config.settings import STREAM_CACHE_SIZE, STREAM_CACHE_TTL, STREAM_VERIFY_AGE
+from utils.stream_check import verify_stream
+from utils.metadata_cache import TTLCache, extract_video_id
 
 logger = logging.getLogger('music_bot')
 
-class YTDLSource(discord.PCMVolumeTransformer):
+# Resolved (data, stream_url, resolved_at) per video, so replays skip the pytubefix round-trip
+_stream_cache = TTLCache(max_size=STREAM_CACHE_SIZE, ttl=STREAM_CACHE_TTL)
+
+# FFmpeg options for streamed playback, built once rather than per track
+STREAM_FFMPEG_OPTIONS = {
+    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
+    'options': '-vn'
+}
+
+class YTDLSource(discord.AudioSource):
+    """
+    Playable audio for one track.
+
+    Opus streams are remuxed by FFmpeg and sent to Discord as they are, so they
+    are neither decoded nor re-encoded and always play at full volume; other
+    codecs are decoded to PCM behind a volume control.
+    """
     def __init__(self, source, *, data, volume=0.5):
-        super().__init__(source, volume)
+        self.original = source
+        self._pcm = None if source.is_opus() else discord.PCMVolumeTransformer(source, volume)
         self.data = data
         self.title = data.get('title', 'Unknown Title')
         self.url = data.get('url', '')
@@ -21,111 +40,153 @@ class YTDLSource(discord.PCMVolumeTransformer):
         self.thumbnail = data.get('thumbnail', '')
         self.stream_url = None
         self._ffmpeg_process = None
-        self._volume = volume
+
+    @property
+    def volume(self) -> float:
+        return self._pcm.volume if self._pcm else 1.0
+
+    @volume.setter
+    def volume(self, value: float) -> None:
+        if self._pcm:
+            self._pcm.volume = value
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def read(self) -> bytes:
+        """Read a 20ms frame, skipping the volume multiply at unity gain."""
+        if self._pcm is None or self._pcm.volume == 1.0:
+            return self.original.read()
+        return self._pcm.read()
 
     @classmethod
-    async def from_url(cls, url, *, loop=None, stream=True):
-        """Create a YTDLSource from a URL."""
+    async def from_url(cls, url, *, loop=None, stream=True, executor=None, session=None):
+        """
+        Create a YTDLSource from a URL, running blocking work on the given executor.
+
+        An aiohttp session, if given, is used to check streams that need verifying.
+        """
         loop = loop or asyncio.get_event_loop()
         
         try:
-            # Extract info using pytubefix
-            logger.info(f"Extracting info for URL: {url}")
-            yt = await loop.run_in_executor(
-                None,
-                lambda: YouTube(url, use_oauth=True, allow_oauth_cache=True)
-            )
-
-            if not yt:
-                raise ValueError("Could not extract video information")
-
-            # Format data similar to previous structure
-            data = {
-                'title': yt.title,
-                'url': url,
-                'duration': yt.length,
-                'thumbnail': yt.thumbnail_url,
-            }
-
-            # Get best audio stream
-            streams = yt.streams.filter(only_audio=True)
-            
-            # Try to find highest quality audio stream
-            best_audio = None
-            
-            # First try to find Opus format if available
-            for stream in streams:
-                if 'opus' in stream.audio_codec.lower():
-                    best_audio = stream
+            for _ in range(2):
+                cache_key, data, stream_url, resolved_at = await cls._cached_stream(url, loop, executor)
+
+                # A cached stream URL can be revoked before it expires, so one cached
+                # for a while is checked before FFmpeg is pointed at it
+                stale = time.time() - resolved_at > STREAM_VERIFY_AGE
+                source = await cls._create_audio_source(
+                    stream_url, session=session,
+                    verify=stale,
+                    opus='opus' in (data.get('acodec') or '').lower()
+                )
+                if source:
+                    break
+                # Forget the URL; a stale one gets a single fresh resolve right away
+                _stream_cache.delete(cache_key)
+                if not stale:
                     break
-            
-            # If no Opus, get highest quality audio stream
-            if not best_audio:
-                best_audio = streams.order_by('abr').desc().first()
-
-            if not best_audio:
-                raise ValueError("No suitable audio stream found")
-
-            stream_url = best_audio.url
-            logger.info(f"Using audio format: {best_audio.audio_codec} "
-                      f"(bitrate: {best_audio.abr})")
 
-            # Create FFmpeg audio source
-            source = await cls._create_audio_source(stream_url, loop)
             if not source:
                 raise ValueError("Could not create audio source")
 
-            instance = cls(source, data=data)
+            instance = cls(source, data=dict(data))
             instance.stream_url = stream_url
             return instance
 
         except Exception as e:
-            logger.error(f"Error creating source: {e}")
+            logger.error("Error creating source: %s", e)
             raise
 
     @classmethod
-    async def _create_audio_source(cls, url: str, loop) -> Optional[discord.FFmpegPCMAudio]:
-        """Create an audio source with verification."""
+    async def prefetch(cls, url, *, loop=None, executor=None) -> None:
+        """Resolve a URL's audio stream ahead of playback, without starting FFmpeg."""
+        await cls._cached_stream(url, loop or asyncio.get_event_loop(), executor)
+
+    @classmethod
+    async def _cached_stream(cls, url: str, loop, executor=None) -> tuple[str, Dict, str, float]:
+        """Get (cache key, data, stream URL, resolved at) for a URL, resolving it only on a cache miss."""
+        cache_key = extract_video_id(url) or url
+        cached = _stream_cache.get(cache_key)
+        if cached:
+            logger.info("Using cached audio stream for URL: %s", url)
+            return (cache_key, *cached)
+
+        data, stream_url = await loop.run_in_executor(
+            executor,
+            lambda: cls._resolve_stream(url)
+        )
+        resolved_at = time.time()
+        _stream_cache.set(cache_key, (data, stream_url, resolved_at))
+        return cache_key, data, stream_url, resolved_at
+
+    @staticmethod
+    def _resolve_stream(url: str) -> tuple[Dict, str]:
+        """Extract track info and the best audio stream URL using pytubefix."""
+        # Extract info using pytubefix
+        logger.info("Extracting info for URL: %s", url)
+        yt = YouTube(url, use_oauth=True, allow_oauth_cache=True)
+
+        if not yt:
+            raise ValueError("Could not extract video information")
+
+        # Format data similar to previous structure
+        data = {
+            'title': yt.title,
+            'url': url,
+            'duration': yt.length,
+            'thumbnail': yt.thumbnail_url,
+        }
+
+        # Get best audio stream
+        best_audio = YTDLSource._best_audio_stream(yt.streams.filter(only_audio=True))
+
+        if not best_audio:
+            raise ValueError("No suitable audio stream found")
+
+        data['acodec'] = best_audio.audio_codec
+
+        logger.info("Using audio format: %s (bitrate: %s)",
+                    best_audio.audio_codec, best_audio.abr)
+        return data, best_audio.url
+
+    @staticmethod
+    def _best_audio_stream(streams):
+        """Pick the first Opus stream, else the highest-bitrate one, in a single pass."""
+        best_audio = None
+        for stream in streams:
+            if 'opus' in stream.audio_codec.lower():
+                return stream
+            if best_audio is None or (stream.bitrate or 0) > (best_audio.bitrate or 0):
+                best_audio = stream
+        return best_audio
+
+    @classmethod
+    async def _create_audio_source(cls, url: str, *, verify: bool = True, session=None,
+                                   opus: bool = False) -> Optional[discord.AudioSource]:
+        """Create an audio source, first test-decoding the stream if verify is set."""
         try:
-            # Test the audio stream
-            logger.info("Testing audio stream...")
-            test_command = [
-                'ffmpeg',
-                '-v', 'error',
-                '-i', url,
-                '-t', '1',  # Test first second only
-                '-f', 'null',
-                '-'
-            ]
-            
-            process = await loop.run_in_executor(
-                None,
-                lambda: subprocess.run(test_command, 
-                                     stderr=subprocess.PIPE,
-                                     timeout=5)
-            )
+            if verify:
+                await verify_stream(url, session)
 
-            if process.stderr:
-                logger.warning(f"Stream test warning: {process.stderr.decode()}")
+            if opus:
+                logger.info("Creating FFmpeg Opus passthrough source...")
+                return discord.FFmpegOpusAudio(url, codec='opus', **STREAM_FFMPEG_OPTIONS)
 
             logger.info("Creating FFmpeg audio source...")
-            ffmpeg_options = {
-                'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                'options': '-vn'
-            }
             return discord.FFmpegPCMAudio(
                 url,
-                **ffmpeg_options
+                **STREAM_FFMPEG_OPTIONS
             )
 
         except Exception as e:
-            logger.error(f"Error creating audio source: {e}")
+            logger.error("Error creating audio source: %s", e)
             return None
 
     @classmethod
-    async def from_track(cls, track, *, loop=None):
+    async def from_track(cls, track, *, loop=None, executor=None, session=None):
         """Create a YTDLSource from a Track object."""
-        return await cls.from_url(track.url, loop=loop, stream=True)
+        return await cls.from_url(track.url, loop=loop, stream=True, executor=executor, session=session)
 
     def cleanup(self):
         """Clean up resources."""
@@ -141,19 +202,4 @@ class YTDLSource(discord.PCMVolumeTransformer):
                     except:
                         pass
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
-
-# Auto-reconnect feature for the music cog
-async def auto_reconnect(voice_client, channel, attempts=5):
-    """Attempt to reconnect to voice channel if disconnected."""
-    for i in range(attempts):
-        try:
-            if not voice_client.is_connected():
-                await channel.connect()
-                logger.info("Successfully reconnected to voice channel")
-                return True
-            return True
-        except Exception as e:
-            logger.error(f"Reconnection attempt {i+1} failed: {e}")
-            await asyncio.sleep(1)
-    return False
\ No newline at end of file
+            logger.error("Error during cleanup: %s", e)